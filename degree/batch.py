@@ -0,0 +1,168 @@
+import csv
+import json
+import multiprocessing
+import sys
+import time
+
+import degrees
+
+
+def main():
+    if len(sys.argv) not in (2, 3, 4):
+        sys.exit("Usage: python batch.py pairs.csv [directory] [processes]")
+    filename = sys.argv[1]
+    directory = sys.argv[2] if len(sys.argv) > 2 else "large"
+    processes = int(sys.argv[3]) if len(sys.argv) > 3 else None
+
+    print("Loading data...", file=sys.stderr)
+    degrees.load_data(directory)
+    print("Data loaded.", file=sys.stderr)
+
+    for result in run_batch(read_pairs(filename), directory, processes):
+        print(json.dumps(result), flush=True)
+
+
+def read_pairs(filename):
+    """
+    Read (source, target) pairs from a CSV file with `source` and `target`
+    columns. Each value may be a person_id or a person's name.
+    """
+    with open(filename, encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        return [(row["source"], row["target"]) for row in reader]
+
+
+def resolve_all(labels, matches=None):
+    """
+    Returns a dict mapping each label to a person_id, or None.
+    Labels that are person_ids map to themselves. Names are resolved in
+    bulk, allowing misspelled or partial names, and a name matching
+    several people resolves to None.
+
+    If `matches` is a dict, it is filled with the name of the person
+    each resolved label matched and the similarity score of the match
+    (1 for person_ids and exact names).
+    """
+    resolved = {}
+    queries = []
+    scores = {}
+    for label in set(labels):
+        if label in degrees.people:
+            resolved[label] = label
+            scores[label] = 1.0
+        else:
+            queries.append(label)
+    for result in degrees.resolve_names(queries):
+        person_ids = result["person_ids"]
+        resolved[result["query"]] = person_ids[0] if len(person_ids) == 1 else None
+        scores[result["query"]] = result["score"]
+    if matches is not None:
+        for label, person_id in resolved.items():
+            if person_id is not None:
+                matches[label] = {"name": degrees.people[person_id]["name"],
+                                  "score": scores[label]}
+    return resolved
+
+
+def group_by_source(pairs, resolved):
+    """
+    Returns a dict mapping each resolved source person_id to the
+    (source, target, target_id) triples queried from it, plus a list of
+    the pairs whose source could not be resolved.
+    """
+    groups = {}
+    unresolved = []
+    for source, target in pairs:
+        source_id = resolved[source]
+        if source_id is None:
+            unresolved.append((source, target))
+        else:
+            groups.setdefault(source_id, []).append(
+                (source, target, resolved[target])
+            )
+    return groups, unresolved
+
+
+def run_batch(pairs, directory, processes=None):
+    """
+    Answer every (source, target) pair, yielding one result dict per pair
+    as soon as its group finishes. Each answer names the people that its
+    source and target matched, with the score of the match, so that a
+    misspelled name matched to someone else can be spotted.
+
+    Pairs are grouped by source so that one search tree answers all of a
+    source's targets, and groups are spread over a pool of `processes`
+    workers. Workers reuse the data already loaded in this process when
+    they are forked, and load `directory` themselves otherwise.
+    """
+    matches = {}
+    resolved = resolve_all((label for pair in pairs for label in pair), matches)
+    groups, unresolved = group_by_source(pairs, resolved)
+    for source, target in unresolved:
+        yield {"source": source, "target": target, "error": "Person not found."}
+
+    # Largest groups first so a long search does not start last
+    groups = sorted(groups.items(), key=lambda group: len(group[1]), reverse=True)
+
+    with multiprocessing.Pool(processes, initializer=_init_worker,
+                              initargs=(directory,)) as pool:
+        for results in pool.imap_unordered(answer_group, groups):
+            for result in results:
+                yield _with_matches(result, matches)
+
+
+def answer_group(group):
+    """
+    Answer all pairs of one source from a single search tree.
+    Returns a list of result dicts with timings: `seconds` is the time
+    spent extracting that query's path, `search_seconds` the search
+    shared by the whole group and `group_seconds` the group's total.
+    """
+    source_id, pairs = group
+    known = {target_id for _, _, target_id in pairs if target_id is not None}
+
+    start = time.perf_counter()
+    timings = {}
+    paths = degrees.shortest_paths(source_id, known, timings)
+    group = time.perf_counter() - start
+
+    results = []
+    for source, target, target_id in pairs:
+        if target_id is None:
+            results.append({"source": source, "target": target,
+                            "error": "Person not found."})
+            continue
+        path = paths[target_id]
+        results.append({
+            "source": source,
+            "target": target,
+            "source_id": source_id,
+            "target_id": target_id,
+            "degrees": None if path is None else len(path),
+            "path": path,
+            "seconds": timings["paths"][target_id],
+            "search_seconds": timings["search"],
+            "group_seconds": group
+        })
+    return results
+
+
+def _with_matches(result, matches):
+    """
+    Returns `result` with the names and scores its labels matched.
+    """
+    for end in ("source", "target"):
+        match = matches.get(result[end])
+        if match is not None:
+            result[f"{end}_name"] = match["name"]
+            result[f"{end}_score"] = match["score"]
+    return result
+
+
+def _init_worker(directory):
+    if not degrees.people:
+        degrees.load_data(directory)
+
+
+if __name__ == "__main__":
+    main()
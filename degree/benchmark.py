@@ -0,0 +1,377 @@
+import math
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import degrees
+import snapshot
+from landmarks import Landmarks
+from util import (Node, StackFrontier, QueueFrontier,
+                  IndexedStackFrontier, IndexedQueueFrontier)
+
+
+def main():
+    if len(sys.argv) < 2:
+        sys.exit("Usage: python benchmark.py "
+                 "search|frontier|memory|startup|landmarks|costars|names [args]")
+    command = sys.argv[1]
+    if command == "search":
+        directory = sys.argv[2] if len(sys.argv) > 2 else "large"
+        pairs = int(sys.argv[3]) if len(sys.argv) > 3 else 100
+        benchmark_search(directory, pairs)
+    elif command == "frontier":
+        benchmark_frontier()
+    elif command == "memory":
+        directory = sys.argv[2] if len(sys.argv) > 2 else "large"
+        pairs = int(sys.argv[3]) if len(sys.argv) > 3 else 100
+        benchmark_memory(directory, pairs)
+    elif command == "startup":
+        directory = sys.argv[2] if len(sys.argv) > 2 else "large"
+        benchmark_startup(directory)
+    elif command == "landmarks":
+        directory = sys.argv[2] if len(sys.argv) > 2 else "large"
+        pairs = int(sys.argv[3]) if len(sys.argv) > 3 else 100
+        k = int(sys.argv[4]) if len(sys.argv) > 4 else 16
+        benchmark_landmarks(directory, pairs, k)
+    elif command == "costars":
+        directory = sys.argv[2] if len(sys.argv) > 2 else "large"
+        pairs = int(sys.argv[3]) if len(sys.argv) > 3 else 100
+        benchmark_costars(directory, pairs)
+    elif command == "names":
+        directory = sys.argv[2] if len(sys.argv) > 2 else "large"
+        queries = int(sys.argv[3]) if len(sys.argv) > 3 else 1000
+        benchmark_names(directory, queries)
+    else:
+        sys.exit(f"Unknown benchmark: {command}")
+
+
+def benchmark_search(directory, n, seed=0):
+    """
+    Compare one-sided and bidirectional BFS on `n` random person pairs,
+    reporting people expanded and wall time for each search.
+    """
+    print("Loading data...")
+    # The dict representation, so that every expansion goes through
+    # `neighbors_for_person` rather than the graph or landmark index
+    reset_data()
+    degrees.load_data(directory, use_snapshot=False)
+    print("Data loaded.")
+
+    rng = random.Random(seed)
+    person_ids = list(degrees.people)
+    pairs = [
+        (rng.choice(person_ids), rng.choice(person_ids))
+        for _ in range(n)
+    ]
+
+    searches = {
+        "bfs": degrees.shortest_path,
+        "bidirectional": degrees.bidirectional_shortest_path
+    }
+    lengths = {}
+    for name, search in searches.items():
+        expanded, elapsed, lengths[name] = run_searches(search, pairs)
+        print(f"{name}:")
+        print(f"  People expanded: {expanded} ({expanded / n:.1f} per query)")
+        print(f"  Wall time: {elapsed:.3f}s ({1000 * elapsed / n:.2f}ms per query)")
+
+    if lengths["bfs"] != lengths["bidirectional"]:
+        sys.exit("Path lengths differ between searches.")
+    print("Path lengths agree.")
+
+
+def run_searches(search, pairs):
+    """
+    Run `search` over every pair, counting calls to `neighbors_for_person`.
+    Return the number of expansions, elapsed seconds and path lengths.
+    """
+    neighbors_for_person = degrees.neighbors_for_person
+    expanded = 0
+
+    def counting_neighbors(person_id):
+        nonlocal expanded
+        expanded += 1
+        return neighbors_for_person(person_id)
+
+    degrees.neighbors_for_person = counting_neighbors
+    try:
+        lengths = []
+        start = time.perf_counter()
+        for source, target in pairs:
+            path = search(source, target)
+            lengths.append(None if path is None else len(path))
+        elapsed = time.perf_counter() - start
+    finally:
+        degrees.neighbors_for_person = neighbors_for_person
+    return expanded, elapsed, lengths
+
+
+def benchmark_frontier(sizes=(10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6), ops=1000):
+    """
+    Measure the per-operation cost of each frontier at several sizes.
+    Each frontier is filled to `size` nodes, then `ops` membership
+    checks and removals are timed against the full frontier.
+    """
+    frontiers = {
+        "StackFrontier": StackFrontier,
+        "QueueFrontier": QueueFrontier,
+        "IndexedStackFrontier": IndexedStackFrontier,
+        "IndexedQueueFrontier": IndexedQueueFrontier
+    }
+    rng = random.Random(0)
+    print(f"{'frontier':<22}{'size':>10}{'add':>12}{'contains':>12}{'remove':>12}")
+    for size in sizes:
+        queries = [rng.randrange(size) for _ in range(ops)]
+        for name, frontier_class in frontiers.items():
+            frontier = frontier_class()
+
+            start = time.perf_counter()
+            for state in range(size):
+                frontier.add(Node(state=state, parent=None, action=None))
+            add = (time.perf_counter() - start) / size
+
+            start = time.perf_counter()
+            for state in queries:
+                frontier.contains_state(state)
+            contains = (time.perf_counter() - start) / ops
+
+            start = time.perf_counter()
+            for _ in range(ops):
+                frontier.remove()
+            remove = (time.perf_counter() - start) / ops
+
+            print(f"{name:<22}{size:>10}{format_seconds(add):>12}"
+                  f"{format_seconds(contains):>12}{format_seconds(remove):>12}")
+
+
+def benchmark_memory(directory, n, seed=0):
+    """
+    Report memory used by the dict-of-sets and compact CSR representations,
+    plus shortest_path wall time on `n` random pairs for each.
+    """
+    results = {}
+    for compact in (False, True):
+        name = "csr" if compact else "dicts"
+        reset_data()
+        tracemalloc.start()
+        start = time.perf_counter()
+        degrees.load_data(directory, compact=compact, use_snapshot=False)
+        load = time.perf_counter() - start
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        rng = random.Random(seed)
+        person_ids = list(degrees.people)
+        pairs = [
+            (rng.choice(person_ids), rng.choice(person_ids))
+            for _ in range(n)
+        ]
+        _, elapsed, results[name] = run_searches(degrees.shortest_path, pairs)
+
+        print(f"{name}:")
+        print(f"  Memory: {memory / 2 ** 20:.1f} MiB")
+        if compact:
+            print(f"  CSR arrays: {degrees.graph.nbytes / 2 ** 20:.1f} MiB")
+        print(f"  Load time: {load:.2f}s")
+        print(f"  shortest_path: {1000 * elapsed / n:.2f}ms per query")
+    reset_data()
+
+    if results["dicts"] != results["csr"]:
+        sys.exit("Path lengths differ between representations.")
+    print("Path lengths agree.")
+
+
+def benchmark_startup(directory):
+    """
+    Time a fresh process loading the dataset from CSV, then from a
+    snapshot written just before.
+    """
+    csv_dicts = time_startup(directory, compact=False, use_snapshot=False)
+    csv_compact = time_startup(directory, compact=True, use_snapshot=False)
+
+    degrees.load_data(directory, compact=True, use_snapshot=False)
+    start = time.perf_counter()
+    snapshot.write(directory, degrees.people, degrees.movies, degrees.graph)
+    build = time.perf_counter() - start
+    reset_data()
+
+    mapped = time_startup(directory, compact=True, use_snapshot=True)
+    print(f"CSV (dicts): {csv_dicts:.3f}s")
+    print(f"CSV (compact): {csv_compact:.3f}s")
+    print(f"Snapshot build: {build:.3f}s")
+    print(f"Snapshot load: {mapped:.3f}s")
+
+
+def time_startup(directory, compact, use_snapshot):
+    """
+    Returns the seconds a new interpreter spends importing `degrees`
+    and loading `directory`.
+    """
+    code = (
+        "import time\n"
+        "start = time.perf_counter()\n"
+        "import degrees\n"
+        f"degrees.load_data({directory!r}, compact={compact}, "
+        f"use_snapshot={use_snapshot})\n"
+        "print(time.perf_counter() - start)\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], check=True, capture_output=True, text=True
+    ).stdout
+    return float(output)
+
+
+def benchmark_landmarks(directory, n, k, seed=0):
+    """
+    Compare query latency of landmark bounds, landmark-pruned search and
+    plain BFS on `n` random pairs, and report how tight the bounds are.
+    """
+    degrees.load_data(directory, compact=True)
+    graph = degrees.graph
+    start = time.perf_counter()
+    index = Landmarks.build(graph, k)
+    print(f"Index build ({k} landmarks): {time.perf_counter() - start:.2f}s")
+
+    rng = random.Random(seed)
+    person_ids = list(degrees.people)
+    pairs = [
+        (rng.choice(person_ids), rng.choice(person_ids))
+        for _ in range(n)
+    ]
+
+    start = time.perf_counter()
+    bounds = [index.bounds(source, target) for source, target in pairs]
+    bounds_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    pruned = [index.shortest_path(source, target) for source, target in pairs]
+    pruned_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    plain = [graph.shortest_path(source, target) for source, target in pairs]
+    plain_time = time.perf_counter() - start
+
+    exact = 0
+    for (lower, upper), path, pruned_path in zip(bounds, plain, pruned):
+        length = math.inf if path is None else len(path)
+        pruned_length = math.inf if pruned_path is None else len(pruned_path)
+        if not lower <= length <= upper or pruned_length != length:
+            sys.exit("Landmark bounds or pruned search are wrong.")
+        exact += lower == upper
+
+    print(f"Bounds: {1e6 * bounds_time / n:.1f}us per query, "
+          f"exact for {exact}/{n} pairs")
+    print(f"Pruned BFS: {1000 * pruned_time / n:.2f}ms per query")
+    print(f"Plain BFS: {1000 * plain_time / n:.2f}ms per query")
+
+
+def benchmark_costars(directory, n, seed=0):
+    """
+    Measure build time and memory of the materialized co-star adjacency
+    and the shortest_path speedup it gives, for both representations.
+    """
+    for compact in (False, True):
+        name = "csr" if compact else "dicts"
+        reset_data()
+        degrees.load_data(directory, compact=compact, use_snapshot=False)
+        degrees.landmark_index = None
+
+        rng = random.Random(seed)
+        person_ids = list(degrees.people)
+        pairs = [
+            (rng.choice(person_ids), rng.choice(person_ids))
+            for _ in range(n)
+        ]
+        expanded, before, lengths = run_searches(degrees.shortest_path, pairs)
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        degrees.build_costars()
+        build = time.perf_counter() - start
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        _, after, costar_lengths = run_searches(degrees.shortest_path, pairs)
+        if costar_lengths != lengths:
+            sys.exit("Path lengths differ with co-star adjacency.")
+
+        print(f"{name}:")
+        print(f"  Build: {build:.2f}s, {memory / 2 ** 20:.1f} MiB")
+        print(f"  shortest_path: {1000 * before / n:.2f}ms -> "
+              f"{1000 * after / n:.2f}ms per query ({before / after:.1f}x)")
+    reset_data()
+
+
+def benchmark_names(directory, n, seed=0):
+    """
+    Measure prefix completion, fuzzy search and bulk resolution latency
+    on `n` names drawn from the dataset, with one typo each.
+    """
+    degrees.load_data(directory)
+    start = time.perf_counter()
+    index = degrees.fuzzy_index()
+    print(f"Index ready: {time.perf_counter() - start:.2f}s")
+
+    rng = random.Random(seed)
+    person_ids = list(degrees.people)
+    names = [
+        degrees.people[rng.choice(person_ids)]["name"] for _ in range(n)
+    ]
+    prefixes = [name[:rng.randint(1, len(name))] for name in names]
+    typos = []
+    for name in names:
+        i = rng.randrange(len(name))
+        typos.append(name[:i] + name[i + 1:])
+
+    start = time.perf_counter()
+    for prefix in prefixes:
+        index.complete(prefix)
+    complete = (time.perf_counter() - start) / n
+
+    start = time.perf_counter()
+    for typo in typos:
+        index.search(typo, limit=5)
+    search = (time.perf_counter() - start) / n
+
+    start = time.perf_counter()
+    results = degrees.resolve_names(typos)
+    resolve = (time.perf_counter() - start) / n
+    found = sum(
+        result["name"] == name.lower() for result, name in zip(results, names)
+    )
+
+    print(f"Prefix completion: {format_seconds(complete)} per query")
+    print(f"Fuzzy search: {format_seconds(search)} per query")
+    print(f"Bulk resolve: {format_seconds(resolve)} per name, "
+          f"{found}/{n} typos resolved to the original name")
+
+
+def reset_data():
+    """
+    Drop any dataset loaded into `degrees`.
+    """
+    degrees.names = {}
+    degrees.people = {}
+    degrees.movies = {}
+    degrees.graph = None
+    degrees.costars = None
+    degrees.landmark_index = None
+    degrees.component_index = None
+    degrees.name_index = None
+
+
+def format_seconds(seconds):
+    """
+    Format a per-operation duration in the most readable unit.
+    """
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.2f}ms"
+    if seconds >= 1e-6:
+        return f"{seconds * 1e6:.2f}us"
+    return f"{seconds * 1e9:.0f}ns"
+
+
+if __name__ == "__main__":
+    main()
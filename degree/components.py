@@ -0,0 +1,183 @@
+import json
+import os
+import random
+import sys
+
+import numpy as np
+
+import snapshot
+
+# Bump when the on-disk layout changes so old indexes are rebuilt
+VERSION = 1
+
+
+def main():
+    if len(sys.argv) > 3:
+        sys.exit("Usage: python components.py [directory] [report.json]")
+    directory = sys.argv[1] if len(sys.argv) > 1 else "large"
+
+    # degrees imports this module, so import it only when building
+    import degrees
+
+    print("Loading data...", file=sys.stderr)
+    degrees.load_data(directory, compact=True)
+    print("Labelling components...", file=sys.stderr)
+    index = Components.build(degrees.graph)
+    index.save(directory)
+    print(f"Component index written to {path_for(directory)}.", file=sys.stderr)
+
+    report = json.dumps(index.report(), indent=2)
+    if len(sys.argv) == 3:
+        with open(sys.argv[2], "w") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+
+
+def path_for(directory):
+    """
+    Returns the directory holding the component index of a dataset.
+    """
+    return os.path.join(directory, ".components")
+
+
+class Components():
+    """
+    Connected components of the person/movie graph.
+
+    `labels[i]` is the component of person index `i`, numbered from the
+    largest component (0) down, and `sizes[c]` is the number of people
+    in component `c`.
+    """
+
+    def __init__(self, graph, labels, sizes):
+        self.graph = graph
+        self.labels = labels
+        self.sizes = sizes
+
+    @classmethod
+    def build(cls, graph):
+        """
+        Label components with union-find, joining every star of a movie
+        to its first star.
+        """
+        parent = list(range(len(graph.person_ids)))
+
+        def find(person):
+            while parent[person] != person:
+                parent[person] = parent[parent[person]]
+                person = parent[person]
+            return person
+
+        indptr = np.asarray(graph.movie_indptr).tolist()
+        indices = np.asarray(graph.movie_indices).tolist()
+        for movie in range(len(graph.movie_ids)):
+            start, end = indptr[movie], indptr[movie + 1]
+            if end - start < 2:
+                continue
+            root = find(indices[start])
+            for star in indices[start + 1:end]:
+                other = find(star)
+                if other != root:
+                    parent[other] = root
+
+        roots = np.array([find(person) for person in range(len(parent))], dtype=np.int64)
+        _, inverse, counts = np.unique(roots, return_inverse=True, return_counts=True)
+        order = np.argsort(-counts, kind="stable")
+        relabel = np.empty(len(order), dtype=np.int32)
+        relabel[order] = np.arange(len(order), dtype=np.int32)
+        return cls(graph, relabel[inverse], counts[order])
+
+    def save(self, directory):
+        """
+        Write the labels to `path_for(directory)` in sorted person_id order.
+        """
+        path = path_for(directory)
+        os.makedirs(path, exist_ok=True)
+        snapshot.invalidate(path)
+        rank = snapshot.sorted_rank(self.graph)
+        labels = self.labels
+        if rank is not None:
+            labels = np.empty_like(self.labels)
+            labels[rank] = self.labels
+        np.save(os.path.join(path, "labels.npy"), labels)
+        np.save(os.path.join(path, "sizes.npy"), self.sizes)
+        snapshot.write_manifest(path, directory, VERSION)
+
+    @classmethod
+    def load(cls, directory, graph):
+        """
+        Load the index of `directory` for `graph`, or return None if there
+        is no index built from the current CSVs.
+        """
+        path = path_for(directory)
+        if snapshot.read_manifest(path, directory, VERSION) is None:
+            return None
+        labels = np.load(os.path.join(path, "labels.npy"), mmap_mode="r")
+        rank = snapshot.sorted_rank(graph)
+        if rank is not None:
+            labels = labels[rank]
+        return cls(graph, labels, np.load(os.path.join(path, "sizes.npy")))
+
+    def connected(self, source, target):
+        """
+        Returns True if two person_ids are in the same component.
+        """
+        index = self.graph.person_index
+        return self.labels[index[source]] == self.labels[index[target]]
+
+    def report(self, sweeps=4, seed=0):
+        """
+        Returns a JSON-ready dict of graph statistics: sizes, degree
+        distributions, component sizes and an estimate of the diameter
+        of the largest component.
+        """
+        graph = self.graph
+        person_degrees = np.diff(graph.person_indptr)
+        cast_sizes = np.diff(graph.movie_indptr)
+        return {
+            "people": len(graph.person_ids),
+            "movies": len(graph.movie_ids),
+            "credits": int(person_degrees.sum()),
+            "movies_per_person": _histogram(person_degrees),
+            "stars_per_movie": _histogram(cast_sizes),
+            "components": len(self.sizes),
+            "largest_components": self.sizes[:10].tolist(),
+            "component_sizes": _histogram(self.sizes),
+            "diameter": self.estimate_diameter(sweeps, seed)
+        }
+
+    def estimate_diameter(self, sweeps=4, seed=0):
+        """
+        Estimate the diameter of the largest component by repeated double
+        sweeps: BFS from a person, then again from the farthest person it
+        reached. The largest eccentricity seen is a lower bound and twice
+        the smallest is an upper bound.
+        """
+        members = np.flatnonzero(np.asarray(self.labels) == 0)
+        if len(members) < 2:
+            return {"lower_bound": 0, "upper_bound": 0, "sweeps": 0}
+
+        rng = random.Random(seed)
+        start = int(members[rng.randrange(len(members))])
+        lower, upper = 0, None
+        for _ in range(sweeps):
+            depth = self.graph.bfs(start).depth
+            eccentricity = int(depth.max())
+            lower = max(lower, eccentricity)
+            upper = eccentricity * 2 if upper is None else min(upper, eccentricity * 2)
+            start = int(np.argmax(depth))
+        return {"lower_bound": lower, "upper_bound": upper, "sweeps": sweeps}
+
+
+def _histogram(values):
+    """
+    Returns [value, count] pairs for every value that occurs.
+    """
+    counts = np.bincount(values)
+    present = np.flatnonzero(counts)
+    return [[int(value), int(counts[value])] for value in present]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import numpy as np
+
+from graph import Tree, expand, expand_positions
+
+
+class CoStars():
+    """
+    Person -> co-star adjacency materialized from a `Graph`.
+
+    The co-stars of person `i` are `indices[indptr[i]:indptr[i + 1]]`,
+    each listed once with one movie they share in `movies` at the same
+    position, so a search visits every neighbor exactly once instead of
+    once per shared movie.
+    """
+
+    def __init__(self, graph, indptr, indices, movies):
+        self.graph = graph
+        self.indptr = indptr
+        self.indices = indices
+        self.movies = movies
+
+    @classmethod
+    def build(cls, graph, block=1 << 22):
+        """
+        Build the adjacency from a graph, expanding roughly `block`
+        (person, co-star) candidates at a time to bound peak memory.
+        """
+        n_people = len(graph.person_ids)
+        cast_sizes = np.diff(graph.movie_indptr)
+        person_indptr = np.asarray(graph.person_indptr)
+        person_indices = np.asarray(graph.person_indices)
+
+        # Candidates per person are the sizes of their casts, summed
+        edge_people, _ = graph.edges()
+        work = np.bincount(
+            edge_people, weights=cast_sizes[person_indices], minlength=n_people
+        ).cumsum()
+
+        indptr = np.zeros(n_people + 1, dtype=np.int64)
+        indices, movies = [], []
+        start = 0
+        while start < n_people:
+            done = work[start - 1] if start else 0
+            end = max(int(np.searchsorted(work, done + block, side="right")), start + 1)
+
+            # Every (person, co-star, movie) triple for people [start, end)
+            credits = np.arange(person_indptr[start], person_indptr[end])
+            people = edge_people[credits]
+            movie, co_star = expand(
+                graph.movie_indptr, graph.movie_indices, person_indices[credits]
+            )
+            person = np.repeat(people, cast_sizes[person_indices[credits]])
+            keep = person != co_star
+            person, co_star, movie = person[keep], co_star[keep], movie[keep]
+
+            # Keep the first movie seen for each (person, co-star) pair
+            keys, first = np.unique(
+                person.astype(np.int64) * n_people + co_star, return_index=True
+            )
+            indices.append((keys % n_people).astype(np.int32))
+            movies.append(movie[first].astype(np.int32))
+            indptr[start + 1:end + 1] = np.bincount(
+                (keys // n_people - start).astype(np.int64), minlength=end - start
+            )
+            start = end
+
+        np.cumsum(indptr, out=indptr)
+        indices = np.concatenate(indices) if indices else np.zeros(0, np.int32)
+        movies = np.concatenate(movies) if movies else np.zeros(0, np.int32)
+        return cls(graph, indptr, indices, movies)
+
+    @property
+    def nbytes(self):
+        """
+        Total size of the adjacency arrays in bytes.
+        """
+        return self.indptr.nbytes + self.indices.nbytes + self.movies.nbytes
+
+    def __getitem__(self, person_id):
+        """
+        Returns (movie_id, person_id) pairs for each co-star of a person,
+        with one shared movie per co-star.
+        """
+        person = self.graph.person_index[person_id]
+        start, end = self.indptr[person], self.indptr[person + 1]
+        movie_ids, person_ids = self.graph.movie_ids, self.graph.person_ids
+        return {
+            (movie_ids[movie], person_ids[co_star])
+            for movie, co_star in zip(self.movies[start:end].tolist(),
+                                      self.indices[start:end].tolist())
+        }
+
+    def bfs(self, source, targets=None):
+        """
+        Breadth-first search from person index `source` over co-stars,
+        one whole level at a time, with the same result as `Graph.bfs`.
+        """
+        n_people = len(self.graph.person_ids)
+        depth = np.full(n_people, -1, dtype=np.int32)
+        via_movie = np.full(n_people, -1, dtype=np.int32)
+        parent = np.full(n_people, -1, dtype=np.int32)
+        remaining = None if targets is None else set(targets) - {source}
+
+        depth[source] = 0
+        frontier = np.array([source], dtype=np.int32)
+        level = 0
+        while len(frontier) and (remaining is None or remaining):
+            level += 1
+            owners, positions = expand_positions(self.indptr, frontier)
+            reached = self.indices[positions]
+            fresh = depth[reached] == -1
+            reached, index = np.unique(reached[fresh], return_index=True)
+            depth[reached] = level
+            parent[reached] = owners[fresh][index]
+            via_movie[reached] = self.movies[positions[fresh][index]]
+            frontier = reached
+
+            if remaining is not None:
+                remaining.difference_update(frontier.tolist())
+
+        return Tree(self.graph, source, depth, via_movie, parent)
+
+    def shortest_path(self, source, target):
+        """
+        Returns the shortest list of (movie_id, person_id) pairs that
+        connect the source to the target.
+        """
+        index = self.graph.person_index
+        source, target = index[source], index[target]
+        return self.bfs(source, targets=[target]).path(target)
@@ -1,7 +1,14 @@
 import csv
 import sys
+import time
 
-from util import Node, StackFrontier, QueueFrontier
+import snapshot
+from components import Components
+from costars import CoStars
+from graph import Graph
+from landmarks import Landmarks
+from nameindex import NameIndex
+from util import Node, IndexedQueueFrontier
 
 # Maps names to a set of corresponding person_ids
 names = {}
@@ -12,20 +19,60 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# Compact CSR graph; when set, people and movies have no movie/star sets
+graph = None
 
-def load_data(directory):
+# Landmark distance index over `graph`, if one was built for the dataset
+landmark_index = None
+
+# Connected components of `graph`, if they were labelled for the dataset
+component_index = None
+
+# Prefix/trigram index over the keys of `names`, see fuzzy_index
+name_index = None
+
+# Maps person_ids to (movie_id, person_id) pairs with one movie per co-star,
+# once materialized by build_costars
+costars = None
+
+
+def load_data(directory, compact=False, use_snapshot=True):
     """
     Load data from CSV files into memory.
+
+    With `compact`, the person/movie graph is kept as integer CSR arrays
+    in `graph` instead of as sets inside `people` and `movies`.
+    If `use_snapshot` is true and `directory` has an up-to-date snapshot
+    (see snapshot.py), it is memory-mapped instead of parsing the CSVs,
+    which always gives the compact representation. Landmark and component
+    indexes (see landmarks.py and components.py) are picked up for the
+    compact representation too.
     """
+    global names, people, movies, graph, landmark_index, component_index
+    global name_index, costars
+
+    costars = None
+    name_index = None
+    if use_snapshot and snapshot.is_fresh(directory):
+        names, people, movies, graph = snapshot.load(directory)
+        landmark_index = Landmarks.load(directory, graph)
+        component_index = Components.load(directory, graph)
+        name_index = NameIndex.load(snapshot.path_for(directory))
+        return
+
+    # Start afresh, as a snapshot loaded earlier leaves read-only mappings
+    names, people, movies = {}, {}, {}
+
     # Load people
     with open(f"{directory}/people.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
         for row in reader:
             people[row["id"]] = {
                 "name": row["name"],
-                "birth": row["birth"],
-                "movies": set()
+                "birth": row["birth"]
             }
+            if not compact:
+                people[row["id"]]["movies"] = set()
             names.setdefault(row["name"].lower(), set()).add(row["id"])
 
     # Load movies
@@ -34,16 +81,55 @@ def load_data(directory):
         for row in reader:
             movies[row["id"]] = {
                 "title": row["title"],
-                "year": row["year"],
-                "stars": set()
+                "year": row["year"]
             }
+            if not compact:
+                movies[row["id"]]["stars"] = set()
 
     # Load stars
     with open(f"{directory}/stars.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
-        for row in reader:
-            people[row["person_id"]]["movies"].add(row["movie_id"])
-            movies[row["movie_id"]]["stars"].add(row["person_id"])
+        if compact:
+            person_ids, movie_ids = list(people), list(movies)
+            person_index = {person_id: i for i, person_id in enumerate(person_ids)}
+            movie_index = {movie_id: j for j, movie_id in enumerate(movie_ids)}
+            edge_people, edge_movies = [], []
+            for row in reader:
+                edge_people.append(person_index[row["person_id"]])
+                edge_movies.append(movie_index[row["movie_id"]])
+            graph = Graph.from_edges(person_ids, movie_ids, edge_people, edge_movies)
+            landmark_index = Landmarks.load(directory, graph)
+            component_index = Components.load(directory, graph)
+        else:
+            graph = None
+            landmark_index = None
+            component_index = None
+            for row in reader:
+                people[row["person_id"]]["movies"].add(row["movie_id"])
+                movies[row["movie_id"]]["stars"].add(row["person_id"])
+
+
+def build_costars():
+    """
+    Materialize each person's co-stars once, keeping a single shared movie
+    per co-star, so that searches stop walking whole casts and visit each
+    neighbor once. Call after load_data.
+    """
+    global costars
+    if graph is not None:
+        costars = CoStars.build(graph)
+        return
+
+    costars = {}
+    for person_id, person in people.items():
+        neighbors = {}
+        for movie_id in person["movies"]:
+            for co_star in movies[movie_id]["stars"]:
+                if co_star != person_id:
+                    neighbors.setdefault(co_star, movie_id)
+        costars[person_id] = {
+            (movie_id, co_star) for co_star, movie_id in neighbors.items()
+        }
 
 
 def main():
@@ -63,7 +149,7 @@ def main():
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    path = bidirectional_shortest_path(source, target)
 
     if path is None:
         print("Not connected.")
@@ -83,7 +169,16 @@ def shortest_path(source, target):
     Returns the shortest list of (movie_id, person_id) pairs that
     connect the source to the target.
     """
-    frontier = QueueFrontier()
+    if not connected(source, target):
+        return None
+    if landmark_index is not None:
+        return landmark_index.shortest_path(source, target)
+    if isinstance(costars, CoStars):
+        return costars.shortest_path(source, target)
+    if graph is not None:
+        return graph.shortest_path(source, target)
+
+    frontier = IndexedQueueFrontier()
     frontier.add(Node(state=source, parent=None, action=None))
     explored = set()
 
@@ -109,6 +204,145 @@ def shortest_path(source, target):
     return None
 
 
+def bidirectional_shortest_path(source, target):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs that
+    connect the source to the target, searching from both ends and
+    always expanding the smaller frontier one full level at a time.
+    """
+    if source == target:
+        return []
+    if not connected(source, target):
+        return None
+
+    # Maps each reached person to (movie_id, person_id) towards its own end
+    parents = {source: None}, {target: None}
+    depths = {source: 0}, {target: 0}
+    frontiers = [source], [target]
+
+    while frontiers[0] and frontiers[1]:
+        side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+        other = 1 - side
+        best = None
+        next_frontier = []
+
+        for person_id in frontiers[side]:
+            depth = depths[side][person_id] + 1
+            for movie_id, neighbor in neighbors_for_person(person_id):
+                if neighbor in parents[side]:
+                    continue
+                parents[side][neighbor] = (movie_id, person_id)
+                depths[side][neighbor] = depth
+                next_frontier.append(neighbor)
+                if neighbor in parents[other]:
+                    length = depth + depths[other][neighbor]
+                    if best is None or length < best[0]:
+                        best = (length, neighbor)
+
+        # Finish the level before stopping so the meeting point is optimal
+        if best is not None:
+            return _join_paths(parents[0], parents[1], best[1])
+
+        frontiers = (
+            (next_frontier, frontiers[1]) if side == 0
+            else (frontiers[0], next_frontier)
+        )
+
+    return None
+
+
+def shortest_paths(source, targets, timings=None):
+    """
+    Returns a dict mapping each of `targets` to the shortest list of
+    (movie_id, person_id) pairs from the source, or None if not connected.
+    A single breadth-first search tree is shared by all targets.
+
+    If `timings` is a dict, it is filled with the seconds spent on the
+    shared search under "search" and, under "paths", a dict of the
+    seconds spent extracting each target's path from the tree.
+    """
+    start = time.perf_counter()
+    paths = {}
+    extract = {}
+    targets = set(targets)
+    for target in targets:
+        if not connected(source, target):
+            paths[target] = None
+            extract[target] = 0.0
+    targets -= set(paths)
+
+    if graph is not None:
+        index = graph.person_index
+        search = costars if isinstance(costars, CoStars) else graph
+        tree = search.bfs(index[source], targets=[index[t] for t in targets])
+        searched = time.perf_counter() - start
+        for target in targets:
+            timer = time.perf_counter()
+            paths[target] = tree.path(index[target])
+            extract[target] = time.perf_counter() - timer
+    else:
+        parents = {source: None}
+        remaining = targets - {source}
+        frontier = [source]
+        while frontier and remaining:
+            next_frontier = []
+            for person_id in frontier:
+                for movie_id, neighbor in neighbors_for_person(person_id):
+                    if neighbor not in parents:
+                        parents[neighbor] = (movie_id, person_id)
+                        next_frontier.append(neighbor)
+                        remaining.discard(neighbor)
+            frontier = next_frontier
+        searched = time.perf_counter() - start
+        for target in targets:
+            timer = time.perf_counter()
+            paths[target] = _path_to(parents, target) if target in parents else None
+            extract[target] = time.perf_counter() - timer
+
+    if timings is not None:
+        timings["search"] = searched
+        timings["paths"] = extract
+    return paths
+
+
+def connected(source, target):
+    """
+    Returns False if the component index proves the two people are not
+    connected, in O(1). Returns True otherwise.
+    """
+    if component_index is None:
+        return True
+    return component_index.connected(source, target)
+
+
+def _path_to(parents, person_id):
+    """
+    Follows a parent map back to its root and returns the path from
+    the root to `person_id`.
+    """
+    path = []
+    while parents[person_id] is not None:
+        movie_id, parent = parents[person_id]
+        path.append((movie_id, person_id))
+        person_id = parent
+    path.reverse()
+    return path
+
+
+def _join_paths(forward, backward, meeting):
+    """
+    Combines the parent maps of both search directions into a single
+    source-to-target path through the meeting person.
+    """
+    path = _path_to(forward, meeting)
+    person_id = meeting
+    while backward[person_id] is not None:
+        movie_id, child = backward[person_id]
+        path.append((movie_id, child))
+        person_id = child
+    return path
+
+
 def person_id_for_name(name):
     """
     Returns the IMDB id for a person's name,
@@ -116,6 +350,11 @@ def person_id_for_name(name):
     """
     person_ids = list(names.get(name.lower(), set()))
     if len(person_ids) == 0:
+        suggestions = fuzzy_index().search(name, limit=5)
+        if suggestions:
+            print("Did you mean: " + ", ".join(
+                people[next(iter(names[match]))]["name"] for match, _ in suggestions
+            ) + "?")
         return None
     elif len(person_ids) > 1:
         print(f"Which '{name}'?")
@@ -135,11 +374,43 @@ def person_id_for_name(name):
         return person_ids[0]
 
 
+def fuzzy_index():
+    """
+    Returns the prefix/trigram name index, building it from `names` the
+    first time it is needed if the data did not come from a snapshot.
+    """
+    global name_index
+    if name_index is None:
+        name_index = NameIndex.build(names)
+    return name_index
+
+
+def resolve_names(queries, threshold=0.5):
+    """
+    Resolve a list of possibly misspelled or partial names at once.
+    Returns one dict per query with the matched lowercase name, its
+    person_ids and a similarity score (1 for exact matches).
+    """
+    # Only build the index if some name has no exact match
+    if all(query.lower() in names for query in queries):
+        return [
+            {"query": query, "name": query.lower(),
+             "person_ids": sorted(names[query.lower()]), "score": 1.0}
+            for query in queries
+        ]
+    return fuzzy_index().resolve_many(queries, names, threshold)
+
+
 def neighbors_for_person(person_id):
     """
     Returns (movie_id, person_id) pairs for all people
     who starred in a movie with the given person.
     """
+    if costars is not None:
+        return costars[person_id]
+    if graph is not None:
+        return graph.neighbors(person_id)
+
     neighbors = set()
     for movie_id in people[person_id]["movies"]:
         for co_star in movies[movie_id]["stars"]:
@@ -0,0 +1,231 @@
+import numpy as np
+
+
+class Graph():
+    """
+    Person/movie bipartite graph over dense integer ids.
+
+    `person_ids[i]` and `movie_ids[j]` give the IMDB ids for person `i`
+    and movie `j`. Adjacency is stored in both directions as CSR arrays:
+    the movies of person `i` are
+    `person_indices[person_indptr[i]:person_indptr[i + 1]]` and the stars
+    of movie `j` are `movie_indices[movie_indptr[j]:movie_indptr[j + 1]]`.
+    `person_index` maps IMDB ids back to person indices and is built
+    from `person_ids` when not given.
+    """
+
+    def __init__(self, person_ids, movie_ids, person_indptr, person_indices,
+                 movie_indptr, movie_indices, person_index=None):
+        self.person_ids = person_ids
+        self.movie_ids = movie_ids
+        self.person_indptr = person_indptr
+        self.person_indices = person_indices
+        self.movie_indptr = movie_indptr
+        self.movie_indices = movie_indices
+        if person_index is None:
+            person_index = {
+                person_id: i for i, person_id in enumerate(person_ids)
+            }
+        self.person_index = person_index
+
+    @classmethod
+    def from_edges(cls, person_ids, movie_ids, edge_people, edge_movies):
+        """
+        Build a graph from parallel arrays of person and movie indices,
+        one entry per (person, movie) credit. Duplicate credits are dropped.
+        """
+        edge_people = np.asarray(edge_people, dtype=np.int32)
+        edge_movies = np.asarray(edge_movies, dtype=np.int32)
+        n_people, n_movies = len(person_ids), len(movie_ids)
+
+        keys = np.unique(edge_people.astype(np.int64) * n_movies + edge_movies)
+        edge_people = (keys // n_movies).astype(np.int32)
+        edge_movies = (keys % n_movies).astype(np.int32)
+
+        person_indptr, person_indices = _csr(edge_people, edge_movies, n_people)
+        movie_indptr, movie_indices = _csr(edge_movies, edge_people, n_movies)
+        return cls(person_ids, movie_ids, person_indptr, person_indices,
+                   movie_indptr, movie_indices)
+
+    @classmethod
+    def from_dicts(cls, people, movies):
+        """
+        Build a graph from the `people` and `movies` dicts of `degrees`.
+        """
+        person_ids = list(people)
+        movie_ids = list(movies)
+        movie_index = {movie_id: j for j, movie_id in enumerate(movie_ids)}
+        edge_people, edge_movies = [], []
+        for i, person_id in enumerate(person_ids):
+            for movie_id in people[person_id]["movies"]:
+                edge_people.append(i)
+                edge_movies.append(movie_index[movie_id])
+        return cls.from_edges(person_ids, movie_ids, edge_people, edge_movies)
+
+    def edges(self):
+        """
+        Returns parallel (people, movies) index arrays, one per credit.
+        """
+        counts = np.diff(self.person_indptr)
+        edge_people = np.repeat(
+            np.arange(len(self.person_ids), dtype=np.int32), counts
+        )
+        return edge_people, np.asarray(self.person_indices)
+
+    @property
+    def nbytes(self):
+        """
+        Total size of the CSR arrays in bytes.
+        """
+        return (self.person_indptr.nbytes + self.person_indices.nbytes +
+                self.movie_indptr.nbytes + self.movie_indices.nbytes)
+
+    def movies_for(self, person):
+        """
+        Returns the movie indices of person index `person`.
+        """
+        return self.person_indices[
+            self.person_indptr[person]:self.person_indptr[person + 1]
+        ]
+
+    def stars_for(self, movie):
+        """
+        Returns the person indices of movie index `movie`.
+        """
+        return self.movie_indices[
+            self.movie_indptr[movie]:self.movie_indptr[movie + 1]
+        ]
+
+    def neighbors(self, person_id):
+        """
+        Returns (movie_id, person_id) pairs for all people
+        who starred in a movie with the given person.
+        """
+        person = self.person_index[person_id]
+        neighbors = set()
+        for movie in self.movies_for(person).tolist():
+            movie_id = self.movie_ids[movie]
+            for co_star in self.stars_for(movie).tolist():
+                if co_star != person:
+                    neighbors.add((movie_id, self.person_ids[co_star]))
+        return neighbors
+
+    def bfs(self, source, targets=None, prune=None):
+        """
+        Breadth-first search from person index `source`, one whole level
+        at a time. Stops early once every person index in `targets` has
+        been reached. If given, `prune(persons, level)` returns a mask of
+        the newly reached persons that are worth expanding further.
+
+        Returns a `Tree` holding the depth of each person (-1 when not
+        reached) and the parent pointers needed to rebuild paths.
+        """
+        n_people, n_movies = len(self.person_ids), len(self.movie_ids)
+        depth = np.full(n_people, -1, dtype=np.int32)
+        via_movie = np.full(n_people, -1, dtype=np.int32)
+        parent = np.full(n_people, -1, dtype=np.int32)
+        movie_parent = np.full(n_movies, -1, dtype=np.int32)
+        remaining = None if targets is None else set(targets) - {source}
+
+        depth[source] = 0
+        frontier = np.array([source], dtype=np.int32)
+        level = 0
+        while len(frontier) and (remaining is None or remaining):
+            level += 1
+
+            # Movies of the frontier that have not been used yet
+            owners, reached = expand(
+                self.person_indptr, self.person_indices, frontier
+            )
+            fresh = movie_parent[reached] == -1
+            reached, index = np.unique(reached[fresh], return_index=True)
+            movie_parent[reached] = owners[fresh][index]
+
+            # Stars of those movies that have not been reached yet
+            owners, reached = expand(
+                self.movie_indptr, self.movie_indices, reached
+            )
+            fresh = depth[reached] == -1
+            reached, index = np.unique(reached[fresh], return_index=True)
+            depth[reached] = level
+            via_movie[reached] = owners[fresh][index]
+            parent[reached] = movie_parent[via_movie[reached]]
+            frontier = reached
+
+            if remaining is not None:
+                remaining.difference_update(frontier.tolist())
+            if prune is not None:
+                frontier = frontier[prune(frontier, level)]
+
+        return Tree(self, source, depth, via_movie, parent)
+
+    def shortest_path(self, source, target):
+        """
+        Returns the shortest list of (movie_id, person_id) pairs that
+        connect the source to the target.
+        """
+        source = self.person_index[source]
+        target = self.person_index[target]
+        return self.bfs(source, targets=[target]).path(target)
+
+
+class Tree():
+    """
+    Result of a breadth-first search from one source: the depth of each
+    person, the person they were reached from and the movie they share.
+    """
+
+    def __init__(self, graph, source, depth, via_movie, parent):
+        self.graph = graph
+        self.source = source
+        self.depth = depth
+        self.via_movie = via_movie
+        self.parent = parent
+
+    def path(self, target):
+        """
+        Returns the list of (movie_id, person_id) pairs leading from the
+        source to person index `target`, or None if it was not reached.
+        """
+        if self.depth[target] == -1:
+            return None
+        path = []
+        person = target
+        while person != self.source:
+            movie = int(self.via_movie[person])
+            path.append((self.graph.movie_ids[movie],
+                         self.graph.person_ids[person]))
+            person = int(self.parent[person])
+        path.reverse()
+        return path
+
+
+def _csr(rows, columns, n_rows):
+    """
+    Returns (indptr, indices) for the given (row, column) pairs.
+    """
+    order = np.argsort(rows, kind="stable")
+    indptr = np.zeros(n_rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n_rows), out=indptr[1:])
+    return indptr, columns[order].astype(np.int32)
+
+
+def expand(indptr, indices, nodes):
+    """
+    Returns (owners, neighbors) arrays listing every CSR neighbor of
+    `nodes`, with `owners` giving the node each neighbor came from.
+    """
+    owners, positions = expand_positions(indptr, nodes)
+    return owners, indices[positions]
+
+
+def expand_positions(indptr, nodes):
+    """
+    Returns (owners, positions): the position in the CSR indices array
+    of every neighbor of `nodes`, and the node each one belongs to.
+    """
+    starts = indptr[nodes]
+    counts = indptr[nodes + 1] - starts
+    owners = np.repeat(nodes, counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return owners, np.repeat(starts, counts) + offsets
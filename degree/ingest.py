@@ -0,0 +1,416 @@
+import csv
+import heapq
+import json
+import os
+import resource
+import sys
+import time
+
+import numpy as np
+
+import snapshot
+from strings import StringTable, StringWriter
+
+# Default memory budget for buffers, in bytes
+BUDGET = 256 * 2 ** 20
+
+# Rough cost of one buffered CSV row or sort entry, in bytes
+ROW_BYTES = 256
+
+# Rough cost of one credit while sorting a block of the graph, in bytes
+EDGE_BYTES = 32
+
+
+def main():
+    if len(sys.argv) > 3:
+        sys.exit("Usage: python ingest.py [directory] [budget_mb]")
+    directory = sys.argv[1] if len(sys.argv) > 1 else "large"
+    budget = int(sys.argv[2]) * 2 ** 20 if len(sys.argv) > 2 else BUDGET
+
+    stats = ingest(directory, budget)
+    for filename, entry in stats["files"].items():
+        print(f"{filename}: {entry['rows']} rows in {entry['seconds']:.2f}s "
+              f"({entry['rows'] / max(entry['seconds'], 1e-9):,.0f} rows/s)")
+    if stats["skipped"]:
+        print(f"Skipped {stats['skipped']} credits with unknown ids.")
+    print(f"Total: {stats['seconds']:.2f}s, peak RSS {stats['peak_rss'] / 2 ** 20:.1f} MiB")
+    print(f"Snapshot written to {snapshot.path_for(directory)}.")
+
+
+def ingest(directory, budget=BUDGET):
+    """
+    Stream the CSVs of `directory` into a snapshot (see snapshot.py)
+    without ever holding the rows or the graph in memory.
+
+    CSVs are read `budget // ROW_BYTES` rows at a time, and every column
+    is spilled to disk as it is read. Ids are given their dense ints
+    (their rank in sorted id order) by external merge sorts, and credits
+    are matched to them by merging with the sorted ids, so no table of
+    ids is held in memory. Credits are then scattered straight into
+    memory-mapped CSR arrays, and per-person and per-movie counters are
+    memory-mapped too. Every sort holds at most one run in memory.
+    The trigram name index is not built here; degrees builds it on the
+    first fuzzy lookup.
+
+    Returns per-file row counts and timings, total time and peak RSS.
+    """
+    start = time.perf_counter()
+    path = snapshot.path_for(directory)
+    os.makedirs(path, exist_ok=True)
+    snapshot.invalidate(path)
+    # A name index left by `snapshot.write` would not match the new tables
+    for filename in os.listdir(path):
+        if filename.startswith("index_"):
+            os.remove(os.path.join(path, filename))
+    chunk_rows = max(1000, budget // ROW_BYTES)
+    stats = {"files": {}, "skipped": 0}
+
+    timer = time.perf_counter()
+    n_people, rows = read_records(
+        os.path.join(directory, "people.csv"), path, "person",
+        {"id": "ids", "name": "names", "birth": "births"}, chunk_rows
+    )
+    stats["files"]["people.csv"] = _entry(rows, timer)
+    sort_names(path, chunk_rows)
+
+    timer = time.perf_counter()
+    n_movies, rows = read_records(
+        os.path.join(directory, "movies.csv"), path, "movie",
+        {"id": "ids", "title": "titles", "year": "years"}, chunk_rows
+    )
+    stats["files"]["movies.csv"] = _entry(rows, timer)
+
+    timer = time.perf_counter()
+    rows, stats["skipped"] = read_credits(
+        os.path.join(directory, "stars.csv"), path,
+        n_people, n_movies, chunk_rows, max(1, budget // EDGE_BYTES)
+    )
+    stats["files"]["stars.csv"] = _entry(rows, timer)
+
+    snapshot.write_manifest(path, directory, snapshot.VERSION)
+    stats["seconds"] = time.perf_counter() - start
+    stats["peak_rss"] = peak_rss()
+    return stats
+
+
+def read_chunks(filename, chunk_rows):
+    """
+    Yields (header, rows) with at most `chunk_rows` rows at a time.
+    """
+    with open(filename, encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        chunk = []
+        for row in reader:
+            chunk.append(row)
+            if len(chunk) == chunk_rows:
+                yield header, chunk
+                chunk = []
+        if chunk:
+            yield header, chunk
+
+
+def read_records(filename, path, prefix, columns, chunk_rows):
+    """
+    Stream a people or movies CSV into string tables in sorted id order.
+    `columns` maps CSV columns to table suffixes, e.g. "name" -> "names"
+    writes `person_names`. Where an id is repeated, its first row wins.
+
+    Returns the number of distinct ids and the number of rows read.
+    """
+    writers = {
+        column: StringWriter(path, f"{prefix}_{table}.tmp")
+        for column, table in columns.items()
+    }
+    rows = 0
+    for header, chunk in read_chunks(filename, chunk_rows):
+        positions = {column: header.index(column) for column in columns}
+        for row in chunk:
+            for column, writer in writers.items():
+                writer.append(row[positions[column]])
+        rows += len(chunk)
+    for writer in writers.values():
+        writer.close()
+
+    # Number ids by sorted id, remembering which row each rank came from
+    temporary = StringTable.open(path, writers["id"].name)
+    order = _scratch(path, f"{prefix}_order", rows, np.int64)
+    count = 0
+    previous = None
+    with StringWriter(path, f"{prefix}_{columns['id']}") as ids:
+        for record_id, position in external_sort(
+            ((temporary[i], i) for i in range(rows)), chunk_rows, path, f"{prefix}_ids"
+        ):
+            if record_id == previous:
+                continue
+            previous = record_id
+            order[count] = position
+            count += 1
+            ids.append(record_id)
+    del temporary
+    _remove_table(path, writers["id"].name)
+
+    for column, writer in writers.items():
+        if column == "id":
+            continue
+        table = StringTable.open(path, writer.name)
+        with StringWriter(path, f"{prefix}_{columns[column]}") as output:
+            for begin in range(0, count, chunk_rows):
+                for position in order[begin:min(begin + chunk_rows, count)].tolist():
+                    output.append(table[position])
+        del table
+        _remove_table(path, writer.name)
+    _remove_scratch(order)
+    return count, rows
+
+
+def sort_names(path, run_size):
+    """
+    Write the sorted lowercase `names` table and `name_people.npy` from
+    `person_names` with an external merge sort over runs of `run_size`.
+    """
+    table = StringTable.open(path, "person_names")
+    people = np.lib.format.open_memmap(
+        os.path.join(path, "name_people.npy"), mode="w+",
+        dtype=np.int32, shape=(len(table),)
+    )
+    with StringWriter(path, "names") as names:
+        for i, (name, person) in enumerate(external_sort(
+            ((table[i].lower(), i) for i in range(len(table))), run_size, path, "names"
+        )):
+            names.append(name)
+            people[i] = person
+    people.flush()
+    del people
+
+
+def external_sort(entries, run_size, path, prefix):
+    """
+    Yields the (string, int) tuples of `entries` in sorted order, with an
+    external merge sort that holds at most `run_size` entries in memory.
+    Runs are written as JSON lines to temporary files under `path`.
+    """
+    runs = []
+    try:
+        run = []
+        for entry in entries:
+            run.append(entry)
+            if len(run) == run_size:
+                runs.append(_write_run(path, f"{prefix}.{len(runs)}.tmp", run))
+                run = []
+        if run:
+            runs.append(_write_run(path, f"{prefix}.{len(runs)}.tmp", run))
+        del run
+
+        files = [open(filename, encoding="utf-8") for filename in runs]
+        try:
+            yield from heapq.merge(*[
+                (tuple(json.loads(line)) for line in f) for f in files
+            ])
+        finally:
+            for f in files:
+                f.close()
+    finally:
+        for filename in runs:
+            os.remove(filename)
+
+
+def _write_run(path, name, run):
+    """
+    Sort `run` and write it to `name` under `path`, one JSON line per
+    entry. Returns the filename.
+    """
+    run.sort()
+    filename = os.path.join(path, name)
+    with open(filename, "w", encoding="utf-8") as f:
+        for entry in run:
+            f.write(json.dumps(entry) + "\n")
+    return filename
+
+
+def read_credits(filename, path, n_people, n_movies, chunk_rows, block):
+    """
+    Stream stars.csv into the person and movie CSR arrays of a snapshot.
+
+    The person and movie id of every credit are spilled to disk, then
+    matched to their dense ints by sorting them and merging with the
+    sorted `person_ids` and `movie_ids` tables. The first pass over the
+    matched credits counts them per person and per movie to size the
+    rows; the second scatters each chunk into memory-mapped arrays.
+    Duplicate credits are then dropped one block of `block` credits at
+    a time. Returns the number of rows read and of credits skipped for
+    unknown ids.
+    """
+    writers = {
+        column: StringWriter(path, f"credit_{column}.tmp")
+        for column in ("person_id", "movie_id")
+    }
+    rows = 0
+    for header, chunk in read_chunks(filename, chunk_rows):
+        positions = {column: header.index(column) for column in writers}
+        for row in chunk:
+            for column, writer in writers.items():
+                writer.append(row[positions[column]])
+        rows += len(chunk)
+    for writer in writers.values():
+        writer.close()
+    people = _match_ids(path, writers["person_id"].name, "person_ids", rows, chunk_rows)
+    movies = _match_ids(path, writers["movie_id"].name, "movie_ids", rows, chunk_rows)
+
+    person_counts = _scratch(path, "person_counts", n_people, np.int64)
+    movie_counts = _scratch(path, "movie_counts", n_movies, np.int64)
+    person_counts[:] = 0
+    movie_counts[:] = 0
+    for chunk_people, chunk_movies in _credit_chunks(people, movies, chunk_rows):
+        person_counts[:n_people] += np.bincount(chunk_people, minlength=n_people)
+        movie_counts[:n_movies] += np.bincount(chunk_movies, minlength=n_movies)
+    total = int(person_counts[:n_people].sum())
+
+    person_cursor = _scratch(path, "person_cursor", n_people, np.int64)
+    movie_cursor = _scratch(path, "movie_cursor", n_movies, np.int64)
+    person_cursor[0] = movie_cursor[0] = 0
+    np.cumsum(person_counts[:n_people - 1], out=person_cursor[1:n_people])
+    np.cumsum(movie_counts[:n_movies - 1], out=movie_cursor[1:n_movies])
+    person_indices = _scratch(path, "person_indices", total)
+    movie_indices = _scratch(path, "movie_indices", total)
+    for chunk_people, chunk_movies in _credit_chunks(people, movies, chunk_rows):
+        _scatter(person_indices, person_cursor[:n_people], chunk_people, chunk_movies)
+        _scatter(movie_indices, movie_cursor[:n_movies], chunk_movies, chunk_people)
+    person_indices.flush()
+    movie_indices.flush()
+    for scratch in (people, movies, person_cursor, movie_cursor):
+        _remove_scratch(scratch)
+
+    _compact(path, "person", person_indices, person_counts[:n_people], block)
+    _compact(path, "movie", movie_indices, movie_counts[:n_movies], block)
+    _remove_scratch(person_counts)
+    _remove_scratch(movie_counts)
+    return rows, rows - total
+
+
+def _match_ids(path, name, ids_name, rows, chunk_rows):
+    """
+    Returns a temporary memory-mapped array of the dense int of each id
+    in the spilled string table `name`, or -1 for ids not in the sorted
+    table `ids_name`, by merging the sorted ids of both tables.
+    """
+    table = StringTable.open(path, name)
+    ids = StringTable.open(path, ids_name)
+    matched = _scratch(path, f"{name}_matched", rows, np.int64)
+    matched[:] = -1
+    rank = 0
+    for record_id, position in external_sort(
+        ((table[i], i) for i in range(rows)), chunk_rows, path, name
+    ):
+        while rank < len(ids) and ids[rank] < record_id:
+            rank += 1
+        if rank < len(ids) and ids[rank] == record_id:
+            matched[position] = rank
+    del table, ids
+    _remove_table(path, name)
+    return matched
+
+
+def _credit_chunks(people, movies, chunk_rows):
+    """
+    Yields (people, movies) for each chunk of the matched credits: dense
+    int arrays of the credits whose ids are both known.
+    """
+    for begin in range(0, len(people), chunk_rows):
+        chunk_people = np.asarray(people[begin:begin + chunk_rows])
+        chunk_movies = np.asarray(movies[begin:begin + chunk_rows])
+        known = (chunk_people >= 0) & (chunk_movies >= 0)
+        yield chunk_people[known], chunk_movies[known].astype(np.int32)
+
+
+def _scatter(indices, cursor, rows, columns):
+    """
+    Append `columns` to the CSR rows `rows` at their cursors.
+    """
+    order = np.argsort(rows, kind="stable")
+    rows = rows[order]
+    first = np.searchsorted(rows, rows, side="left")
+    positions = cursor[rows] + (np.arange(len(rows)) - first)
+    indices[positions] = columns[order]
+    cursor += np.bincount(rows, minlength=len(cursor))
+
+
+def _compact(path, name, indices, counts, block):
+    """
+    Sort each CSR row, drop repeated entries in place one block of rows
+    at a time, and save `{name}_indptr.npy` and `{name}_indices.npy`.
+    """
+    indptr = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+    new_counts = np.zeros(len(counts), dtype=np.int64)
+    write = 0
+    start = 0
+    while start < len(counts):
+        end = max(int(np.searchsorted(indptr, indptr[start] + block, side="right")) - 1,
+                  start + 1)
+        segment = np.array(indices[indptr[start]:indptr[end]], dtype=np.int64)
+        owners = np.repeat(np.arange(start, end), counts[start:end])
+        width = int(segment.max(initial=0)) + 1
+        keys = np.unique(owners * width + segment)
+        owners, values = np.divmod(keys, width)
+        indices[write:write + len(values)] = values
+        new_counts[start:end] = np.bincount(owners - start, minlength=end - start)
+        write += len(values)
+        start = end
+
+    np.cumsum(new_counts, out=indptr[1:])
+    np.save(os.path.join(path, f"{name}_indptr.npy"), indptr)
+    output = np.lib.format.open_memmap(
+        os.path.join(path, f"{name}_indices.npy"), mode="w+",
+        dtype=np.int32, shape=(write,)
+    )
+    for begin in range(0, write, block):
+        end = min(begin + block, write)
+        output[begin:end] = indices[begin:end]
+    output.flush()
+    del output
+    filename = indices.filename
+    del indices
+    os.remove(filename)
+
+
+def _scratch(path, name, length, dtype=np.int32):
+    """
+    Returns a temporary memory-mapped array on disk.
+    """
+    return np.memmap(os.path.join(path, f"{name}.tmp"), dtype=dtype,
+                     mode="w+", shape=(max(length, 1),))
+
+
+def _remove_scratch(array):
+    """
+    Delete a temporary array from `_scratch`.
+    """
+    filename = array.filename
+    del array
+    os.remove(filename)
+
+
+def _remove_table(path, name):
+    """
+    Delete a temporary string table.
+    """
+    os.remove(os.path.join(path, f"{name}.bin"))
+    os.remove(os.path.join(path, f"{name}.npy"))
+
+
+def _entry(rows, timer):
+    return {"rows": rows, "seconds": time.perf_counter() - timer}
+
+
+def peak_rss():
+    """
+    Returns the peak resident set size of this process in bytes.
+    """
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes
+    return usage if sys.platform == "darwin" else usage * 1024
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+import math
+import os
+import sys
+
+import numpy as np
+
+import snapshot
+
+# Bump when the on-disk layout changes so old indexes are rebuilt
+VERSION = 1
+
+# Stored distance for people a landmark cannot reach
+UNREACHABLE = 255
+
+
+def main():
+    if len(sys.argv) > 3:
+        sys.exit("Usage: python landmarks.py [directory] [k]")
+    directory = sys.argv[1] if len(sys.argv) > 1 else "large"
+    k = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+
+    # degrees imports this module, so import it only when building
+    import degrees
+
+    print("Loading data...")
+    degrees.load_data(directory, compact=True)
+    print(f"Running BFS from {k} landmarks...")
+    index = Landmarks.build(degrees.graph, k)
+    index.save(directory)
+    print(f"Landmark index written to {path_for(directory)}.")
+
+
+def path_for(directory):
+    """
+    Returns the directory holding the landmark index of a dataset.
+    """
+    return os.path.join(directory, ".landmarks")
+
+
+class Landmarks():
+    """
+    Exact BFS distances from a few high-degree people ("landmarks").
+
+    `distances[l, i]` is the number of degrees between landmark `l` and
+    person index `i`, or UNREACHABLE. By the triangle inequality, for any
+    landmark, |d(s, l) - d(l, t)| <= d(s, t) <= d(s, l) + d(l, t).
+    """
+
+    def __init__(self, graph, landmarks, distances):
+        self.graph = graph
+        self.landmarks = landmarks
+        self.distances = distances
+
+    @classmethod
+    def build(cls, graph, k):
+        """
+        Pick the `k` people with the most co-star credits as landmarks
+        and run a full BFS from each.
+        """
+        cast_sizes = np.diff(graph.movie_indptr)
+        edge_people, edge_movies = graph.edges()
+        co_stars = np.bincount(
+            edge_people, weights=cast_sizes[edge_movies] - 1,
+            minlength=len(graph.person_ids)
+        )
+        landmarks = np.argsort(-co_stars, kind="stable")[:k].astype(np.int32)
+
+        distances = np.empty((len(landmarks), len(graph.person_ids)), dtype=np.uint8)
+        for row, landmark in enumerate(landmarks):
+            depth = graph.bfs(int(landmark)).depth
+            distances[row] = np.where(depth == -1, UNREACHABLE, depth)
+        return cls(graph, landmarks, distances)
+
+    def save(self, directory):
+        """
+        Write the index to `path_for(directory)`.
+        Columns are stored in sorted person_id order so the index does not
+        depend on whether the graph came from the CSVs or a snapshot.
+        """
+        path = path_for(directory)
+        os.makedirs(path, exist_ok=True)
+        snapshot.invalidate(path)
+        rank = snapshot.sorted_rank(self.graph)
+        distances = self.distances
+        if rank is not None:
+            distances = np.empty_like(self.distances)
+            distances[:, rank] = self.distances
+        np.save(os.path.join(path, "distances.npy"), distances)
+        snapshot.write_manifest(
+            path, directory, VERSION,
+            landmarks=[self.graph.person_ids[i] for i in self.landmarks.tolist()]
+        )
+
+    @classmethod
+    def load(cls, directory, graph):
+        """
+        Load the index of `directory` for `graph`, or return None if there
+        is no index built from the current CSVs.
+        """
+        path = path_for(directory)
+        manifest = snapshot.read_manifest(path, directory, VERSION)
+        if manifest is None:
+            return None
+
+        distances = np.load(os.path.join(path, "distances.npy"), mmap_mode="r")
+        rank = snapshot.sorted_rank(graph)
+        if rank is not None:
+            distances = distances[:, rank]
+        landmarks = np.array(
+            [graph.person_index[i] for i in manifest["landmarks"]], dtype=np.int32
+        )
+        return cls(graph, landmarks, distances)
+
+    def lower_bounds(self, persons, target):
+        """
+        Returns a lower bound on the degrees between each person index in
+        `persons` and person index `target` (math.inf if not connected).
+        """
+        to_persons = np.asarray(self.distances[:, persons], dtype=np.int16)
+        to_target = np.asarray(self.distances[:, target], dtype=np.int16)[:, None]
+        reached_persons = to_persons != UNREACHABLE
+        reached_target = to_target != UNREACHABLE
+
+        # A landmark reaching exactly one of the two proves they are apart
+        apart = (reached_persons != reached_target).any(axis=0)
+        both = reached_persons & reached_target
+        bounds = np.where(both, np.abs(to_persons - to_target), 0).max(axis=0, initial=0)
+        return np.where(apart, math.inf, bounds)
+
+    def upper_bound(self, source, target):
+        """
+        Returns an upper bound on the degrees between person indices
+        `source` and `target` (math.inf if no landmark reaches both).
+        """
+        to_source = np.asarray(self.distances[:, source], dtype=np.int16)
+        to_target = np.asarray(self.distances[:, target], dtype=np.int16)
+        both = (to_source != UNREACHABLE) & (to_target != UNREACHABLE)
+        if not both.any():
+            return math.inf
+        return int((to_source + to_target)[both].min())
+
+    def bounds(self, source, target):
+        """
+        Returns (lower, upper) bounds on the degrees of separation between
+        two person_ids. Both are math.inf when they are not connected.
+        """
+        index = self.graph.person_index
+        source, target = index[source], index[target]
+        if source == target:
+            return 0, 0
+        lower = self.lower_bounds(np.array([source]), target)[0]
+        if lower == math.inf:
+            return math.inf, math.inf
+        return max(int(lower), 1), self.upper_bound(source, target)
+
+    def shortest_path(self, source, target):
+        """
+        Returns the shortest list of (movie_id, person_id) pairs that
+        connect the source to the target.
+
+        People whose depth plus lower bound to the target exceeds the
+        landmark upper bound cannot lie on a shortest path, so they are
+        reached but never expanded.
+        """
+        index = self.graph.person_index
+        source, target = index[source], index[target]
+        upper = self.upper_bound(source, target)
+        if self.lower_bounds(np.array([source]), target)[0] == math.inf:
+            return None
+
+        def prune(persons, level):
+            return level + self.lower_bounds(persons, target) <= upper
+
+        return self.graph.bfs(source, targets=[target], prune=prune).path(target)
+
+
+if __name__ == "__main__":
+    main()
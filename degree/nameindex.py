@@ -0,0 +1,150 @@
+import bisect
+import os
+
+import numpy as np
+
+from strings import StringTable, write_strings
+
+# Largest char below the surrogates, used as an upper bound for prefixes
+PREFIX_END = "퟿"
+
+# Trigrams in more names than this are skipped when gathering candidates
+COMMON = 5000
+
+# Number of best candidates that are scored exactly
+CANDIDATES = 200
+
+
+class NameIndex():
+    """
+    Prefix and trigram index over the distinct lowercase person names.
+
+    `names` is sorted, so a prefix selects a contiguous range of it. For
+    fuzzy matching, the names containing trigram `grams[g]` are
+    `postings[indptr[g]:indptr[g + 1]]`.
+    """
+
+    def __init__(self, names, grams, indptr, postings):
+        self.names = names
+        self.grams = grams
+        self.indptr = indptr
+        self.postings = postings
+
+    @classmethod
+    def build(cls, names):
+        """
+        Build the index for an iterable of lowercase names.
+        """
+        names = sorted(set(names))
+        grams, owners = [], []
+        for i, name in enumerate(names):
+            unique = trigrams(name)
+            grams.extend(unique)
+            owners.extend([i] * len(unique))
+
+        grams, inverse = np.unique(np.array(grams, dtype="U3"), return_inverse=True)
+        order = np.argsort(inverse, kind="stable")
+        indptr = np.zeros(len(grams) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(inverse, minlength=len(grams)), out=indptr[1:])
+        postings = np.array(owners, dtype=np.int32)[order]
+        return cls(names, grams, indptr, postings)
+
+    def save(self, path):
+        """
+        Write the index into directory `path` (normally a snapshot).
+        """
+        write_strings(path, "index_names", self.names)
+        for name in ("grams", "indptr", "postings"):
+            np.save(os.path.join(path, f"index_{name}.npy"), getattr(self, name))
+
+    @classmethod
+    def load(cls, path):
+        """
+        Memory-map an index written by `save`, or return None if missing.
+        """
+        if not os.path.exists(os.path.join(path, "index_postings.npy")):
+            return None
+        arrays = [
+            np.load(os.path.join(path, f"index_{name}.npy"), mmap_mode="r")
+            for name in ("grams", "indptr", "postings")
+        ]
+        return cls(StringTable.open(path, "index_names"), *arrays)
+
+    def complete(self, prefix, limit=10):
+        """
+        Returns up to `limit` names starting with `prefix`, in sorted order.
+        """
+        prefix = prefix.lower()
+        start = bisect.bisect_left(self.names, prefix)
+        end = bisect.bisect_left(self.names, prefix + PREFIX_END, lo=start)
+        return [self.names[i] for i in range(start, min(end, start + limit))]
+
+    def search(self, query, limit=10, threshold=0.3):
+        """
+        Returns up to `limit` (name, score) pairs ranked by trigram
+        similarity to `query`, best first. The score is the Dice
+        coefficient of the two trigram sets, from 0 to 1.
+
+        Candidates are the names sharing the most of the query's rarer
+        trigrams; only the best CANDIDATES of them are scored exactly.
+        """
+        query = set(trigrams(query.lower()))
+        grams = sorted(query)
+        positions = np.searchsorted(self.grams, grams)
+        found = [
+            g for g, gram in zip(positions.tolist(), grams)
+            if g < len(self.grams) and self.grams[g] == gram
+        ]
+        if not found:
+            return []
+        rare = [
+            g for g in found if self.indptr[g + 1] - self.indptr[g] <= COMMON
+        ] or found
+
+        candidates = np.concatenate([
+            self.postings[self.indptr[g]:self.indptr[g + 1]] for g in rare
+        ])
+        candidates, shared = np.unique(candidates, return_counts=True)
+        candidates = candidates[np.argsort(-shared, kind="stable")[:CANDIDATES]]
+
+        scored = []
+        for i in candidates.tolist():
+            name = self.names[i]
+            other = set(trigrams(name))
+            score = 2 * len(query & other) / (len(query) + len(other))
+            if score >= threshold:
+                scored.append((name, score))
+        scored.sort(key=lambda match: (-match[1], match[0]))
+        return scored[:limit]
+
+    def resolve_many(self, queries, names, threshold=0.5):
+        """
+        Resolve a list of names in bulk. `names` maps lowercase names to
+        sets of person_ids, as `degrees.names` does.
+
+        Returns one dict per query with the matched name, its person_ids
+        and a score of 1 for exact matches, or the best fuzzy match at or
+        above `threshold`, or no match.
+        """
+        results = []
+        for query in queries:
+            match, score = query.lower(), 1.0
+            if match not in names:
+                ranked = self.search(query, limit=1, threshold=threshold)
+                match, score = ranked[0] if ranked else (None, 0.0)
+            results.append({
+                "query": query,
+                "name": match,
+                "person_ids": sorted(names[match]) if match else [],
+                "score": score
+            })
+        return results
+
+
+def trigrams(name):
+    """
+    Returns the distinct trigrams of a name padded with spaces, so that
+    short names and word starts get trigrams of their own.
+    """
+    padded = f"  {name} "
+    return sorted({padded[i:i + 3] for i in range(len(padded) - 2)})
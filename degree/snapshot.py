@@ -0,0 +1,302 @@
+import bisect
+import hashlib
+import json
+import os
+import sys
+from collections.abc import Mapping
+
+import numpy as np
+
+from graph import Graph
+from nameindex import NameIndex
+from strings import StringTable, write_strings
+
+# Bump when the on-disk layout changes so old snapshots are rebuilt
+VERSION = 2
+
+SOURCES = ("people.csv", "movies.csv", "stars.csv")
+
+
+def main():
+    if len(sys.argv) > 2:
+        sys.exit("Usage: python snapshot.py [directory]")
+    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+
+    # degrees imports this module, so import it only when building
+    import degrees
+
+    print("Loading data...")
+    degrees.load_data(directory, compact=True, use_snapshot=False)
+    print("Writing snapshot...")
+    write(directory, degrees.people, degrees.movies, degrees.graph)
+    print(f"Snapshot written to {path_for(directory)}.")
+
+
+def path_for(directory):
+    """
+    Returns the directory holding the snapshot of a dataset.
+    """
+    return os.path.join(directory, ".snapshot")
+
+
+def fingerprint(directory, previous=None):
+    """
+    Returns the size, mtime and SHA-256 of each source CSV.
+    Hashes are reused from `previous` when size and mtime are unchanged.
+    """
+    sources = {}
+    for filename in SOURCES:
+        stat = os.stat(os.path.join(directory, filename))
+        entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        old = (previous or {}).get(filename)
+        if old and old["size"] == entry["size"] and old["mtime_ns"] == entry["mtime_ns"]:
+            entry["sha256"] = old["sha256"]
+        else:
+            entry["sha256"] = _sha256(os.path.join(directory, filename))
+        sources[filename] = entry
+    return sources
+
+
+def is_fresh(directory):
+    """
+    Returns True if `directory` has a snapshot built from its current CSVs.
+    CSVs whose mtime changed but whose contents did not still count as fresh.
+    """
+    return read_manifest(path_for(directory), directory, VERSION) is not None
+
+
+def sources_match(directory, recorded):
+    """
+    Returns True if the CSVs of `directory` still hash to the `recorded`
+    fingerprint.
+    """
+    try:
+        sources = fingerprint(directory, recorded)
+    except OSError:
+        return False
+    return all(
+        sources[filename]["sha256"] == recorded[filename]["sha256"]
+        for filename in SOURCES
+    )
+
+
+def invalidate(path):
+    """
+    Remove the manifest of the index stored in `path`, if any. Call it
+    before overwriting any file of the index, so that an interrupted
+    rebuild is never seen as fresh.
+    """
+    try:
+        os.remove(os.path.join(path, "manifest.json"))
+    except FileNotFoundError:
+        pass
+
+
+def write_manifest(path, directory, version, **fields):
+    """
+    Write the manifest of an index stored in `path`, recording the CSV
+    fingerprint of `directory` it was built from. Together with
+    `invalidate` before the other files are written, writing it last
+    means a partially written index is never seen as fresh.
+    """
+    manifest = {"version": version, "sources": fingerprint(directory), **fields}
+    filename = os.path.join(path, "manifest.json")
+    with open(f"{filename}.tmp", "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(f"{filename}.tmp", filename)
+
+
+def read_manifest(path, directory, version):
+    """
+    Returns the manifest of the index stored in `path`, or None if it is
+    missing, has another version or was built from different CSVs.
+    """
+    try:
+        with open(os.path.join(path, "manifest.json")) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != version:
+        return None
+    if not sources_match(directory, manifest["sources"]):
+        return None
+    return manifest
+
+
+def sorted_rank(graph):
+    """
+    Returns the position of each person index in sorted person_id order,
+    or None when the graph is already in that order (as in a snapshot).
+    Indexes store per-person arrays in this order so they work with
+    graphs loaded from either the CSVs or a snapshot.
+    """
+    if isinstance(graph.person_index, SortedIndex):
+        return None
+    order = np.argsort(np.array(list(graph.person_ids)), kind="stable")
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+    return rank
+
+
+def write(directory, people, movies, graph):
+    """
+    Write a snapshot of a loaded dataset to `path_for(directory)`.
+
+    People and movies are renumbered in sorted IMDB id order so ids can be
+    found by binary search in the mapped string tables, and names are
+    stored sorted alongside the person index of each entry, together
+    with a prefix/trigram index of them (see nameindex.py).
+    """
+    path = path_for(directory)
+    os.makedirs(path, exist_ok=True)
+    invalidate(path)
+
+    person_order = sorted(range(len(graph.person_ids)),
+                          key=lambda i: graph.person_ids[i])
+    movie_order = sorted(range(len(graph.movie_ids)),
+                         key=lambda j: graph.movie_ids[j])
+    person_ids = [graph.person_ids[i] for i in person_order]
+    movie_ids = [graph.movie_ids[j] for j in movie_order]
+
+    # Map old indices to their sorted position and rebuild the CSR arrays
+    person_rank = np.empty(len(person_order), dtype=np.int32)
+    person_rank[person_order] = np.arange(len(person_order), dtype=np.int32)
+    movie_rank = np.empty(len(movie_order), dtype=np.int32)
+    movie_rank[movie_order] = np.arange(len(movie_order), dtype=np.int32)
+    edge_people, edge_movies = graph.edges()
+    sorted_graph = Graph.from_edges(
+        person_ids, movie_ids, person_rank[edge_people], movie_rank[edge_movies]
+    )
+    for name in ("person_indptr", "person_indices", "movie_indptr", "movie_indices"):
+        np.save(os.path.join(path, f"{name}.npy"), getattr(sorted_graph, name))
+
+    write_strings(path, "person_ids", person_ids)
+    write_strings(path, "person_names", [people[i]["name"] for i in person_ids])
+    write_strings(path, "person_births", [people[i]["birth"] for i in person_ids])
+    write_strings(path, "movie_ids", movie_ids)
+    write_strings(path, "movie_titles", [movies[j]["title"] for j in movie_ids])
+    write_strings(path, "movie_years", [movies[j]["year"] for j in movie_ids])
+
+    lowered = [people[i]["name"].lower() for i in person_ids]
+    name_order = sorted(range(len(lowered)), key=lambda i: lowered[i])
+    write_strings(path, "names", [lowered[i] for i in name_order])
+    np.save(os.path.join(path, "name_people.npy"),
+            np.array(name_order, dtype=np.int32))
+    NameIndex.build(lowered).save(path)
+
+    write_manifest(path, directory, VERSION)
+
+
+def load(directory):
+    """
+    Memory-map the snapshot of `directory`.
+    Returns (names, people, movies, graph) usable in place of the
+    dicts and graph built by `degrees.load_data`.
+    """
+    path = path_for(directory)
+    arrays = {
+        name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+        for name in ("person_indptr", "person_indices", "movie_indptr",
+                     "movie_indices", "name_people")
+    }
+
+    person_ids = StringTable.open(path, "person_ids")
+    movie_ids = StringTable.open(path, "movie_ids")
+    person_index = SortedIndex(person_ids)
+    people = Records(person_index, {
+        "name": StringTable.open(path, "person_names"),
+        "birth": StringTable.open(path, "person_births")
+    })
+    movies = Records(SortedIndex(movie_ids), {
+        "title": StringTable.open(path, "movie_titles"),
+        "year": StringTable.open(path, "movie_years")
+    })
+    names = NameMap(
+        StringTable.open(path, "names"), arrays["name_people"], person_ids
+    )
+    graph = Graph(person_ids, movie_ids,
+                  arrays["person_indptr"], arrays["person_indices"],
+                  arrays["movie_indptr"], arrays["movie_indices"],
+                  person_index=person_index)
+    return names, people, movies, graph
+
+
+class SortedIndex(Mapping):
+    """
+    Maps each string of a sorted `StringTable` to its position.
+    """
+
+    def __init__(self, table):
+        self.table = table
+
+    def __getitem__(self, key):
+        i = bisect.bisect_left(self.table, key)
+        if i == len(self.table) or self.table[i] != key:
+            raise KeyError(key)
+        return i
+
+    def __iter__(self):
+        return iter(self.table)
+
+    def __len__(self):
+        return len(self.table)
+
+
+class Records(Mapping):
+    """
+    Maps ids to dicts of fields, read from per-field string tables.
+    """
+
+    def __init__(self, index, fields):
+        self.index = index
+        self.fields = fields
+
+    def __getitem__(self, key):
+        i = self.index[key]
+        return {field: table[i] for field, table in self.fields.items()}
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __len__(self):
+        return len(self.index)
+
+
+class NameMap(Mapping):
+    """
+    Maps lowercase names to the set of person_ids with that name.
+    """
+
+    def __init__(self, names, people, person_ids):
+        self.names = names
+        self.people = people
+        self.person_ids = person_ids
+
+    def __getitem__(self, key):
+        start = bisect.bisect_left(self.names, key)
+        end = bisect.bisect_right(self.names, key, lo=start)
+        if start == end:
+            raise KeyError(key)
+        return {self.person_ids[i] for i in self.people[start:end].tolist()}
+
+    def __iter__(self):
+        previous = None
+        for name in self.names:
+            if name != previous:
+                yield name
+            previous = name
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+def _sha256(filename):
+    digest = hashlib.sha256()
+    with open(filename, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import array
+import mmap
+import os
+
+import numpy as np
+
+
+def write_strings(path, name, strings):
+    """
+    Write `strings` as a UTF-8 blob plus an array of byte offsets.
+    """
+    with StringWriter(path, name) as writer:
+        for s in strings:
+            writer.append(s)
+
+
+class StringWriter():
+    """
+    Writes a string table one string at a time, without holding the
+    strings in memory. Only the offsets are kept until `close`.
+    """
+
+    def __init__(self, path, name):
+        self.path = path
+        self.name = name
+        self.blob = open(os.path.join(path, f"{name}.bin"), "wb")
+        self.offsets = array.array("q", [0])
+
+    def append(self, s):
+        encoded = s.encode("utf-8")
+        self.blob.write(encoded)
+        self.offsets.append(self.offsets[-1] + len(encoded))
+
+    def close(self):
+        self.blob.close()
+        np.save(os.path.join(self.path, f"{self.name}.npy"),
+                np.frombuffer(self.offsets, dtype=np.int64))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class StringTable():
+    """
+    Read-only sequence of strings backed by a memory-mapped blob.
+    """
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    @classmethod
+    def open(cls, path, name):
+        offsets = np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+        with open(os.path.join(path, f"{name}.bin"), "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return cls(b"", offsets)
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ), offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("string table index out of range")
+        return self.blob[self.offsets[i]:self.offsets[i + 1]].decode("utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
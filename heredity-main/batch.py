@@ -0,0 +1,222 @@
+import csv
+import hashlib
+import json
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+from heredity import PROBS, load_data
+from inference import marginals
+
+# Bump when the cached results change form
+VERSION = 1
+
+# Directory that results are cached in, by family and PROBS
+CACHE = ".marginals"
+
+
+def main():
+    if len(sys.argv) < 2 or len(sys.argv) > 4:
+        sys.exit("Usage: python batch.py directory|families.jsonl|- [output.jsonl] [processes]")
+    output = sys.argv[2] if len(sys.argv) > 2 else "-"
+    processes = int(sys.argv[3]) if len(sys.argv) > 3 else None
+
+    families = read_families(sys.argv[1])
+    start = time.perf_counter()
+    if output == "-":
+        stats = run(families, sys.stdout, processes)
+    else:
+        with open(output, "w") as f:
+            stats = run(families, f, processes)
+    print(f"{stats['families']} families ({stats['cached']} cached, "
+          f"{stats['failed']} failed) in {time.perf_counter() - start:.2f}s",
+          file=sys.stderr)
+
+
+def read_families(source):
+    """
+    Returns a list of (id, people) pairs, with people in the form of
+    `heredity.load_data`, from either a directory of CSV files, each one
+    family named by its filename, or a JSON lines file (or "-" for
+    standard input) of objects like
+
+        {"id": "potters", "people": [
+            {"name": "Harry", "mother": "Lily", "father": "James", "trait": null},
+            ...
+        ]}
+
+    where trait is 1, 0 or null as in the CSV files.
+
+    A family that cannot be read has the error in place of its people,
+    and an id of its line number if it has none, so that one bad family
+    does not stop the others.
+    """
+    if os.path.isdir(source):
+        families = []
+        for filename in sorted(os.listdir(source)):
+            if filename.endswith(".csv"):
+                try:
+                    people = load_data(os.path.join(source, filename))
+                except (KeyError, ValueError, csv.Error) as e:
+                    people = e
+                families.append((filename, people))
+        return families
+    f = sys.stdin if source == "-" else open(source)
+    try:
+        families = []
+        for number, line in enumerate(f, 1):
+            if line.strip():
+                families.append(parse_family(line, f"line {number}"))
+        return families
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def parse_family(line, default_id):
+    """
+    Returns the (id, people) pair of one JSON line of `read_families`, or
+    the error that prevented reading it in place of people. The id is
+    `default_id` if the line has none.
+    """
+    family_id = default_id
+    try:
+        family = json.loads(line)
+        if not isinstance(family, dict):
+            raise ValueError("Family is not a JSON object")
+        family_id = family.get("id", default_id)
+        if not isinstance(family_id, str):
+            family_id = json.dumps(family_id)
+        return family_id, people_from_rows(family["people"])
+    except (KeyError, ValueError, TypeError) as e:
+        return family_id, e
+
+
+def people_from_rows(rows):
+    """
+    Returns people in the form of `heredity.load_data` from a list of
+    dicts with the fields of its CSV rows.
+
+    Raises ValueError if a row is not an object or a name is not a
+    non-empty string.
+    """
+    if not isinstance(rows, list):
+        raise ValueError("People are not a JSON list")
+    people = {}
+    for row in rows:
+        if not isinstance(row, dict):
+            raise ValueError(f"Person {row!r} is not a JSON object")
+        if not isinstance(row.get("name"), str) or not row["name"]:
+            raise ValueError(f"Invalid name {row.get('name')!r}")
+        for parent in ("mother", "father"):
+            if row.get(parent) and not isinstance(row[parent], str):
+                raise ValueError(f"Invalid {parent} {row[parent]!r}")
+        people[row["name"]] = {
+            "name": row["name"],
+            "mother": row.get("mother") or None,
+            "father": row.get("father") or None,
+            "trait": (None if row.get("trait") in (None, "")
+                      else str(row["trait"]) in ("1", "True", "true"))
+        }
+    return people
+
+
+def family_key(people, probs=PROBS):
+    """
+    Returns a hash of a family and the model, which is the same for the
+    same people listed in any order.
+    """
+    family = sorted(
+        (data["name"], data["mother"] or "", data["father"] or "",
+         -1 if data["trait"] is None else int(data["trait"]))
+        for data in people.values()
+    )
+    return hashlib.sha256(
+        json.dumps([VERSION, family, _encode_probs(probs)], sort_keys=True).encode()
+    ).hexdigest()
+
+
+def run(families, output, processes=None, cache=CACHE, probs=PROBS):
+    """
+    Compute the marginals of every (id, people) pair in `families` and
+    write them to the file `output` as JSON lines, in order of
+    completion. Families already in the `cache` directory are written
+    first; the rest are computed on a pool of `processes` workers, the
+    largest family first so that no large family is left until last.
+
+    Families that could not be read, with an error in place of their
+    people, are written as that error and counted as failures.
+
+    Returns the number of families, cached results and failures.
+    """
+    os.makedirs(cache, exist_ok=True)
+    stats = {"families": len(families), "cached": 0, "failed": 0}
+    pending = []
+    for family_id, people in families:
+        if isinstance(people, Exception):
+            stats["failed"] += 1
+            _write(output, family_id, {"error": f"{type(people).__name__}: {people}"})
+            continue
+        key = family_key(people, probs)
+        path = os.path.join(cache, f"{key}.json")
+        if os.path.exists(path):
+            with open(path) as f:
+                result = json.load(f)
+            stats["cached"] += 1
+            _write(output, family_id, result)
+        else:
+            pending.append((len(people), family_id, people, key))
+
+    pending.sort(key=lambda task: task[0], reverse=True)
+    with Pool(processes) as pool:
+        tasks = [(family_id, people, key, probs) for _, family_id, people, key in pending]
+        for family_id, key, result in pool.imap_unordered(_solve, tasks):
+            if "error" in result:
+                stats["failed"] += 1
+            else:
+                # Write to a temporary file first, so that an interrupted
+                # run never leaves a partial result in the cache
+                path = os.path.join(cache, f"{key}.json")
+                with open(f"{path}.tmp", "w") as f:
+                    json.dump(result, f)
+                os.replace(f"{path}.tmp", path)
+            _write(output, family_id, result)
+    return stats
+
+
+def _solve(task):
+    """
+    Returns the marginals of one family, or the error that prevented
+    computing them, with the family's id and cache key.
+    """
+    family_id, people, key, probs = task
+    try:
+        probabilities = marginals(people, probs)
+    except (KeyError, ValueError, IndexError, MemoryError) as e:
+        return family_id, key, {"error": f"{type(e).__name__}: {e}"}
+    return family_id, key, {
+        "people": {
+            person: {field: {str(value).lower(): p for value, p in values.items()}
+                     for field, values in distribution.items()}
+            for person, distribution in probabilities.items()
+        }
+    }
+
+
+def _write(output, family_id, result):
+    output.write(json.dumps({"id": family_id, **result}) + "\n")
+
+
+def _encode_probs(probs):
+    """
+    Returns `probs` with every key a string, so that it can be hashed as
+    JSON.
+    """
+    if isinstance(probs, dict):
+        return {str(key): _encode_probs(value) for key, value in probs.items()}
+    return probs
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+import glob
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import warnings
+
+import numpy as np
+
+import batch
+import heredity
+import inference
+import sampling
+import vectorized
+
+# Largest family the exponential enumeration is run on for comparison
+ENUMERATION_PEOPLE = 6
+
+
+def main():
+    if len(sys.argv) < 2:
+        sys.exit("Usage: python benchmark.py inference|vectorized|sampling|batch [args]")
+    command = sys.argv[1]
+    if command == "inference":
+        max_people = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+        inbreeding = float(sys.argv[3]) if len(sys.argv) > 3 else 0.05
+        benchmark_inference(max_people, inbreeding)
+    elif command == "vectorized":
+        people = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+        batch_size = int(sys.argv[3]) if len(sys.argv) > 3 else 10 ** 6
+        benchmark_vectorized(people, batch_size)
+    elif command == "sampling":
+        max_samples = int(sys.argv[2]) if len(sys.argv) > 2 else 10 ** 5
+        people = int(sys.argv[3]) if len(sys.argv) > 3 else 1000
+        benchmark_sampling(max_samples, people)
+    elif command == "batch":
+        families = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+        processes = int(sys.argv[3]) if len(sys.argv) > 3 else None
+        benchmark_batch(families, processes)
+    else:
+        sys.exit(f"Unknown benchmark: {command}")
+
+
+def benchmark_inference(max_people, inbreeding=0.05, seed=0):
+    """
+    Time variable elimination on generated families of 4 people up to
+    `max_people`, checking it against enumeration on small families.
+    """
+    sizes = [4, 5, 6] + [n for n in (10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+                         if n <= max_people]
+    for n in sizes:
+        people = random_family(n, inbreeding, seed)
+        start = time.perf_counter()
+        probabilities = inference.marginals(people)
+        elapsed = time.perf_counter() - start
+        cliques, _ = inference.clique_tree(people, inference.elimination_order(people))
+
+        print(f"{n} people, largest clique {max(len(clique) for clique in cliques)}:")
+        print(f"  Variable elimination: {format_seconds(elapsed)}")
+        if n <= ENUMERATION_PEOPLE:
+            start = time.perf_counter()
+            expected = heredity.enumerate_probabilities(people)
+            enumerated = time.perf_counter() - start
+            print(f"  Enumeration: {format_seconds(enumerated)} "
+                  f"(largest difference {difference(probabilities, expected):.2e})")
+
+    # Large sibships give cliques with many children's messages
+    for sibship in (20, 100, 1000):
+        people = random_family(max(max_people, 2 * sibship), inbreeding, seed, sibship)
+        start = time.perf_counter()
+        inference.marginals(people)
+        elapsed = time.perf_counter() - start
+        print(f"{len(people)} people in sibships of {sibship}:")
+        print(f"  Variable elimination: {format_seconds(elapsed)}")
+
+
+def benchmark_vectorized(n, batch_size, seed=0):
+    """
+    Compare the throughput of `heredity.joint_probability` with the
+    batched `vectorized.joint_probabilities` on `batch_size` random
+    assignments, then time full enumeration both ways on a generated
+    family of `n` people.
+    """
+    people = random_family(n, seed=seed)
+    names = list(people)
+    rng = np.random.default_rng(seed)
+    genes = rng.integers(0, 3, (batch_size, n), dtype=np.int8)
+    have_trait = rng.random((batch_size, n)) < 0.5
+
+    start = time.perf_counter()
+    batched = vectorized.joint_probabilities(people, genes, have_trait)
+    elapsed = time.perf_counter() - start
+    sample = min(batch_size, 10 ** 4)
+    start = time.perf_counter()
+    scalar = [
+        heredity.joint_probability(
+            people,
+            {names[i] for i in np.flatnonzero(genes[row] == 1)},
+            {names[i] for i in np.flatnonzero(genes[row] == 2)},
+            {names[i] for i in np.flatnonzero(have_trait[row])}
+        )
+        for row in range(sample)
+    ]
+    looped = time.perf_counter() - start
+    error = np.abs(batched[:sample] - scalar).max()
+    print(f"{n} people, random assignments:")
+    print(f"  joint_probability: {sample / looped:,.0f} assignments/s")
+    print(f"  Vectorized: {batch_size / elapsed:,.0f} assignments/s "
+          f"({looped / sample * batch_size / elapsed:.0f}x, largest difference {error:.2e})")
+
+    stats = {}
+    start = time.perf_counter()
+    expected = heredity.enumerate_probabilities(people, stats)
+    looped = time.perf_counter() - start
+    start = time.perf_counter()
+    probabilities = vectorized.marginals(people)
+    elapsed = time.perf_counter() - start
+    print(f"{n} people, full enumeration:")
+    print(f"  heredity: {format_seconds(looped)} "
+          f"({stats['evaluated'] / looped:,.0f} assignments/s)")
+    print(f"  Vectorized: {format_seconds(elapsed)} "
+          f"({3 ** n / elapsed:,.0f} gene assignments/s, {looped / elapsed:.0f}x, "
+          f"largest difference {difference(probabilities, expected):.2e})")
+
+
+def benchmark_sampling(max_samples, people, seed=0):
+    """
+    Compare both sampling methods with exact inference on the data/
+    families and a generated family of `people` people, for 10^3 samples
+    up to `max_samples`: the effective sample size, the largest error,
+    the mean standard error and how many estimates fall within three
+    standard errors. Likelihood weighting that falls back to Gibbs
+    sampling is marked as such.
+    """
+    families = {path: heredity.load_data(path) for path in sorted(glob.glob("data/*.csv"))}
+    families[f"{people} people"] = random_family(people, seed=seed)
+    for name, family in families.items():
+        print(f"{name}:")
+        expected = inference.marginals(family)
+        for method in sampling.METHODS:
+            samples = 1000
+            while samples <= max_samples:
+                stats = {}
+                start = time.perf_counter()
+                with warnings.catch_warnings():
+                    warnings.simplefilter("ignore", RuntimeWarning)
+                    probabilities, errors = sampling.estimate(family, method, samples,
+                                                              seed=seed, stats=stats)
+                elapsed = time.perf_counter() - start
+                deviations = [
+                    (abs(probabilities[person]["gene"][gene] - expected[person]["gene"][gene]),
+                     errors[person]["gene"][gene])
+                    for person in family for gene in inference.GENES
+                ]
+                covered = sum(deviation <= 3 * error for deviation, error in deviations)
+                used = "" if stats["method"] == method else f" (fell back to {stats['method']})"
+                ess = "" if stats["ess"] is None else f"ESS {stats['ess']:,.0f}, "
+                print(f"  {method}{used}, {samples} samples: {format_seconds(elapsed)}, {ess}"
+                      f"largest error {max(d for d, _ in deviations):.4f}, "
+                      f"mean standard error {np.mean([e for _, e in deviations]):.4f}, "
+                      f"{100 * covered / len(deviations):.0f}% within 3 standard errors")
+                samples *= 10
+
+
+def benchmark_batch(families, processes=None, seed=0):
+    """
+    Time `batch.run` on `families` generated families of 3 to 300
+    people, first with an empty cache and then with every result cached.
+    """
+    rng = random.Random(seed)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "families.jsonl")
+        with open(path, "w") as f:
+            for i in range(families):
+                people = random_family(int(3 * 100 ** rng.random()), seed=seed + i)
+                f.write(json.dumps({"id": f"family{i}", "people": list(people.values())}) + "\n")
+        loaded = batch.read_families(path)
+        cache = os.path.join(directory, "cache")
+        print(f"{families} families, {sum(len(people) for _, people in loaded)} people:")
+        for run in ("Uncached", "Cached"):
+            with open(os.devnull, "w") as output:
+                start = time.perf_counter()
+                batch.run(loaded, output, processes, cache)
+                elapsed = time.perf_counter() - start
+            print(f"  {run}: {format_seconds(elapsed)} ({families / elapsed:,.0f} families/s)")
+
+
+def random_family(n, inbreeding=0.05, seed=0, sibship=1):
+    """
+    Returns a generated family of `n` people in the form of
+    `heredity.load_data`. Each couple has one parent from the family and,
+    with probability `inbreeding`, another parent from the family too,
+    or otherwise a new parent who marries in, and has `sibship` children
+    (fewer if the family would grow past `n`). Half of the people have a
+    known trait.
+    """
+    rng = random.Random(seed)
+    people = {}
+
+    def add(mother=None, father=None):
+        name = f"Person{len(people)}"
+        trait = rng.random() < 0.3 if rng.random() < 0.5 else None
+        people[name] = {"name": name, "mother": mother, "father": father, "trait": trait}
+        return name
+
+    add()
+    add()
+    while len(people) < n:
+        parent = rng.choice(list(people))
+        others = [person for person in people if person != parent]
+        if rng.random() < inbreeding or len(people) + 2 > n:
+            partner = rng.choice(others)
+        else:
+            partner = add()
+        couple = rng.sample([parent, partner], 2)
+        for _ in range(min(sibship, n - len(people))):
+            add(*couple)
+    return people
+
+
+def difference(probabilities, expected):
+    """
+    Returns the largest absolute difference between two sets of gene and
+    trait probabilities.
+    """
+    return max(
+        abs(probabilities[person][field][value] - expected[person][field][value])
+        for person in expected
+        for field in expected[person]
+        for value in expected[person][field]
+    )
+
+
+def format_seconds(seconds):
+    if seconds < 1:
+        return f"{1000 * seconds:.2f}ms"
+    return f"{seconds:.2f}s"
+
+
+if __name__ == "__main__":
+    main()
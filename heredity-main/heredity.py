@@ -1,5 +1,6 @@
 import csv
 import itertools
+import math
 import sys
 from types import NoneType
 
@@ -46,6 +47,16 @@ def main():
     if len(sys.argv) != 2:
         sys.exit("Usage: python heredity.py data.csv")
     people = load_data(sys.argv[1])
+    stats = {}
+    probabilities = enumerate_probabilities(people, stats)
+
+    # Print results
+    print_probabilities(people, probabilities)
+    print(f"Evaluated {stats['evaluated']} joint probabilities, "
+          f"skipped {stats['skipped']} inconsistent assignments")
+
+
+def enumerate_probabilities(people, stats=None):
 
     # Keep track of gene and trait probabilities for each person
     probabilities = {
@@ -63,33 +74,19 @@ def main():
         for person in people
     }
 
-    # Loop over all sets of people who might have the trait
-    names = set(people)
-    for have_trait in powerset(names):
-
-        # Check if current set of people violates known information
-        fails_evidence = any(
-            (people[person]["trait"] is not None and
+    # Loop over every assignment consistent with known information
+    for one_gene, two_genes, have_trait in assignments(people, stats):
 
-                people[person]["trait"] != (person in have_trait))
-
-            for person in names
-        )
-        if fails_evidence:
-            continue
-
-        # Loop over all sets of people who might have the gene
-        for one_gene in powerset(names):
-            for two_genes in powerset(names - one_gene):
-
-                # Update probabilities with new joint probability
-                p = joint_probability(people, one_gene, two_genes, have_trait)
-                update(probabilities, one_gene, two_genes, have_trait, p)
+        # Update probabilities with new joint probability
+        p = joint_probability(people, one_gene, two_genes, have_trait)
+        update(probabilities, one_gene, two_genes, have_trait, p)
 
     # Ensure probabilities sum to 1
     normalize(probabilities)
+    return probabilities
 
-    # Print results
+
+def print_probabilities(people, probabilities):
     for person in people:
         print(f"{person}:")
         for field in probabilities[person]:
@@ -115,6 +112,58 @@ def load_data(filename):
     return data
 
 
+def assignments(people, stats=None):
+    names = set(people)
+
+    # People with a known trait keep it, so only unknown traits are enumerated
+    unknown = [person for person in people if people[person]["trait"] is None]
+    known = {person for person in people if people[person]["trait"]}
+
+    # Gene counts that could explain each person's known trait, or their
+    # unconditional probability if their parents are not known
+    genes = {
+        person: {
+            count for count in (0, 1, 2)
+            if (people[person]["trait"] is None or
+                PROBS["trait"][count][people[person]["trait"]] > 0)
+            and (people[person]["mother"] and people[person]["father"] or
+                 PROBS["gene"][count] > 0)
+        }
+        for person in people
+    }
+    may_have_one = {person for person in names if 1 in genes[person]}
+    may_have_two = {person for person in names if 2 in genes[person]}
+    must_have_gene = {person for person in names if 0 not in genes[person]}
+
+    # Count against enumerating every trait set and gene assignment
+    if stats is not None:
+        consistent = 2 ** len(unknown) * math.prod(len(counts) for counts in genes.values())
+        stats["evaluated"] = 0
+        stats["skipped"] = 2 ** len(names) * 3 ** len(names) - consistent
+
+    evaluated = 0
+    try:
+        for traits in itertools.product((False, True), repeat=len(unknown)):
+            have_trait = known | {person for person, trait in zip(unknown, traits) if trait}
+
+            # Build each set of people only when it is needed
+            for one_gene in subsets(may_have_one):
+                for two_genes in subsets(may_have_two - one_gene):
+                    if not must_have_gene or must_have_gene <= one_gene | two_genes:
+                        evaluated += 1
+                        yield one_gene, two_genes, have_trait
+    finally:
+        if stats is not None:
+            stats["evaluated"] = evaluated
+
+
+def subsets(s):
+    s = list(s)
+    for r in range(len(s) + 1):
+        for subset in itertools.combinations(s, r):
+            yield set(subset)
+
+
 def powerset(s):
     s = list(s)
     return [
@@ -0,0 +1,268 @@
+import heapq
+import sys
+
+import numpy as np
+
+from heredity import PROBS, load_data, print_probabilities
+
+# Gene counts a person can have
+GENES = (0, 1, 2)
+
+
+def main():
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python inference.py data.csv")
+    people = load_data(sys.argv[1])
+    print_probabilities(people, marginals(people))
+
+
+def marginals(people, probs=PROBS):
+    """
+    Return the gene and trait probabilities of every person, in the
+    same form as `heredity.main` computes them, by variable elimination
+    over the pedigree instead of enumerating every assignment.
+
+    The gene counts of the people are the variables. Each person has a
+    factor of their gene count given their parents' (or the prior, for
+    people without both parents known), times the probability of their
+    trait if it is known. The factors are grouped into the cliques of an
+    elimination order, and one pass of messages up and one down the
+    resulting clique tree gives the marginal of every person at once, in
+    time linear in the number of people and exponential only in the
+    size of the largest clique.
+    """
+    factors = family_factors(people, probs)
+    order = elimination_order(people)
+    cliques, parents = clique_tree(people, order)
+    position = {person: i for i, person in enumerate(order)}
+
+    # Each factor goes to the clique of the first of its people eliminated
+    potentials = [np.ones((3,) * len(clique)) for clique in cliques]
+    for scope, table in factors:
+        i = min(position[person] for person in scope)
+        potentials[i] = potentials[i] * align(cliques[i], scope, table)
+    children = [[] for _ in cliques]
+    for i, parent in enumerate(parents):
+        if parent is not None:
+            children[parent].append(i)
+
+    # Cliques come before their parents in elimination order. Each clique
+    # multiplies in its children's messages once, one at a time
+    up = [None] * len(cliques)
+    for i, clique in enumerate(cliques):
+        for c in children[i]:
+            potentials[i] *= align(clique, cliques[c][1:], up[c])
+            potentials[i] /= potentials[i].sum()
+        if parents[i] is not None:
+            up[i] = marginalize(clique, potentials[i], clique[1:])
+
+    # The message down to a child is its parent's belief with the child's
+    # own message divided back out, so siblings are not multiplied again
+    down = [None] * len(cliques)
+    for j in reversed(range(len(cliques))):
+        if down[j] is not None:
+            potentials[j] *= align(cliques[j], cliques[j][1:], down[j])
+            potentials[j] /= potentials[j].sum()
+        for i in children[j]:
+            message = align(cliques[j], cliques[i][1:], up[i])
+            # Where a child's message is zero, so is everything it explains
+            belief = np.divide(potentials[j], message,
+                               out=np.zeros_like(potentials[j]), where=message > 0)
+            down[i] = marginalize(cliques[j], belief, cliques[i][1:])
+
+    probabilities = {}
+    for i, clique in enumerate(cliques):
+        gene = marginalize(clique, potentials[i], clique[:1])
+        probabilities[clique[0]] = distribution(people[clique[0]], gene, probs)
+    return {person: probabilities[person] for person in people}
+
+
+def inheritance(probs=PROBS):
+    """
+    Returns the 3 x 3 x 3 table of the probability that a child has each
+    number of genes, indexed by the gene counts of mother, father and
+    child.
+    """
+    mutation = probs["mutation"]
+    # Probability that a parent with each gene count passes the gene on
+    passes = np.array([mutation, 0.5, 1 - mutation])
+    mother, father = np.meshgrid(passes, passes, indexing="ij")
+    return np.stack([
+        (1 - mother) * (1 - father),
+        mother * (1 - father) + (1 - mother) * father,
+        mother * father
+    ], axis=-1)
+
+
+def family_factors(people, probs=PROBS):
+    """
+    Returns the factors of the joint probability of a family as a list
+    of (scope, table) pairs, where scope is a tuple of people and table
+    has one axis of gene counts per person.
+    """
+    table = inheritance(probs)
+    prior = np.array([probs["gene"][gene] for gene in GENES])
+    factors = []
+    for person, data in people.items():
+        if data["mother"] and data["father"]:
+            factors.append(((data["mother"], data["father"], person), table))
+        else:
+            factors.append(((person,), prior))
+        if data["trait"] is not None:
+            factors.append(((person,), np.array([
+                probs["trait"][gene][data["trait"]] for gene in GENES
+            ])))
+    return factors
+
+
+def moral_graph(people):
+    """
+    Returns a dict from each person to the set of people they share a
+    factor with: their parents, their children and their co-parents.
+    """
+    neighbors = {person: set() for person in people}
+    for person, data in people.items():
+        if data["mother"] and data["father"]:
+            family = (data["mother"], data["father"], person)
+            for a in family:
+                neighbors[a].update(b for b in family if b != a)
+    return neighbors
+
+
+def elimination_order(people):
+    """
+    Returns the people in a greedy min-fill elimination order, breaking
+    ties by fewest neighbors, so that the cliques stay small.
+
+    The fill of each person (pairs of their neighbors not linked to each
+    other) is kept up to date as people are removed and edges added,
+    rather than recounted, so a parent of a large sibship costs time
+    linear in the sibship per elimination instead of quadratic. Costs
+    are kept in a heap, and stale entries are skipped when popped.
+    """
+    neighbors = moral_graph(people)
+    index = {person: i for i, person in enumerate(people)}
+    fill = {}
+    for person, adjacent in neighbors.items():
+        adjacent = list(adjacent)
+        fill[person] = sum(
+            1 for i, a in enumerate(adjacent) for b in adjacent[i + 1:]
+            if b not in neighbors[a]
+        )
+
+    def cost(person):
+        return fill[person], len(neighbors[person]), index[person]
+
+    costs = {person: cost(person) for person in people}
+    heap = [(c, person) for person, c in costs.items()]
+    heapq.heapify(heap)
+    order = []
+    while heap:
+        c, person = heapq.heappop(heap)
+        if costs.get(person) != c:
+            continue
+        del costs[person]
+        order.append(person)
+
+        # Remove the person, losing the pairs they were part of
+        adjacent = neighbors.pop(person)
+        changed = set(adjacent)
+        for a in adjacent:
+            neighbors[a].discard(person)
+            fill[a] -= len(neighbors[a] - adjacent)
+
+        # Then link their neighbors to each other
+        adjacent = list(adjacent)
+        for i, a in enumerate(adjacent):
+            for b in adjacent[i + 1:]:
+                if b in neighbors[a]:
+                    continue
+                common = neighbors[a] & neighbors[b]
+                for other in common:
+                    fill[other] -= 1
+                changed.update(common)
+                fill[a] += len(neighbors[a] - neighbors[b])
+                fill[b] += len(neighbors[b] - neighbors[a])
+                neighbors[a].add(b)
+                neighbors[b].add(a)
+
+        for other in changed:
+            costs[other] = cost(other)
+            heapq.heappush(heap, (costs[other], other))
+    return order
+
+
+def clique_tree(people, order):
+    """
+    Returns the cliques formed by eliminating people in `order` and the
+    index of each clique's parent in the tree (None for roots).
+
+    Clique i is the person eliminated i-th followed by their neighbors
+    at that point; its parent is the clique of whichever of those
+    neighbors is eliminated first.
+    """
+    neighbors = moral_graph(people)
+    position = {person: i for i, person in enumerate(order)}
+    cliques, parents = [], []
+    for person in order:
+        rest = tuple(sorted(neighbors[person], key=position.get))
+        cliques.append((person,) + rest)
+        parents.append(position[rest[0]] if rest else None)
+        _eliminate(neighbors, person)
+    return cliques, parents
+
+
+def _eliminate(neighbors, person):
+    """
+    Remove `person` from the graph `neighbors`, connecting all of their
+    neighbors to each other.
+    """
+    adjacent = neighbors.pop(person)
+    for a in adjacent:
+        neighbors[a].discard(person)
+        neighbors[a].update(b for b in adjacent if b != a)
+
+
+def align(scope, variables, table):
+    """
+    Returns `table`, with one axis per person of `variables`, with its
+    axes reordered and padded to broadcast against a table over `scope`.
+    """
+    axes = sorted(range(len(variables)), key=lambda axis: scope.index(variables[axis]))
+    shape = [1] * len(scope)
+    for axis in axes:
+        shape[scope.index(variables[axis])] = 3
+    return np.transpose(table, axes).reshape(shape)
+
+
+def marginalize(scope, table, variables):
+    """
+    Returns `table` over `scope` summed over every person not in
+    `variables`, with axes in the order of `variables`, normalized to
+    sum to 1 so that long chains of messages do not underflow.
+    """
+    kept = [scope.index(person) for person in variables]
+    summed = tuple(axis for axis in range(len(scope)) if axis not in kept)
+    table = table.sum(axis=summed)
+    # Remaining axes are in scope order; put them in the order asked for
+    table = np.transpose(table, np.argsort(np.argsort(kept)))
+    return table / table.sum()
+
+
+def distribution(data, gene, probs=PROBS):
+    """
+    Returns the gene and trait probabilities of a person, in the form of
+    `heredity.main`, from the marginal of their gene count.
+    """
+    if data["trait"] is None:
+        trait = sum(gene[g] * probs["trait"][g][True] for g in GENES)
+    else:
+        trait = float(data["trait"])
+    return {
+        "gene": {g: float(gene[g]) for g in reversed(GENES)},
+        "trait": {True: float(trait), False: float(1 - trait)}
+    }
+
+
+if __name__ == "__main__":
+    main()
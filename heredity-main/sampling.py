@@ -0,0 +1,261 @@
+import sys
+import warnings
+from multiprocessing import Pool
+
+import numpy as np
+
+from heredity import PROBS, load_data
+from inference import GENES, distribution, inheritance
+from vectorized import encode, trait_table
+
+METHODS = ("likelihood", "gibbs")
+
+# Samples in total and independent chains they are split over, one task per chain
+SAMPLES = 100000
+CHAINS = 4
+
+# Likelihood-weighted samples drawn at a time
+BATCH = 10000
+
+# Effective sample size below which likelihood weighting falls back to Gibbs
+MIN_ESS = 100
+
+# Gibbs chains run side by side within each task, and the sweeps each
+# discards before recording
+WALKERS = 64
+BURN_IN = 100
+
+
+def main():
+    if len(sys.argv) < 2 or len(sys.argv) > 6:
+        sys.exit("Usage: python sampling.py data.csv [likelihood|gibbs] [samples] [chains] [seed]")
+    people = load_data(sys.argv[1])
+    method = sys.argv[2] if len(sys.argv) > 2 else "likelihood"
+    samples = int(sys.argv[3]) if len(sys.argv) > 3 else SAMPLES
+    chains = int(sys.argv[4]) if len(sys.argv) > 4 else CHAINS
+    seed = int(sys.argv[5]) if len(sys.argv) > 5 else None
+
+    probabilities, errors = estimate(people, method, samples, chains, seed)
+    for person in people:
+        print(f"{person}:")
+        for field in probabilities[person]:
+            print(f"  {field.capitalize()}:")
+            for value in probabilities[person][field]:
+                print(f"    {value}: {probabilities[person][field][value]:.4f} "
+                      f"± {errors[person][field][value]:.4f}")
+
+
+def estimate(people, method="likelihood", samples=SAMPLES, chains=CHAINS,
+             seed=None, processes=None, probs=PROBS, stats=None):
+    """
+    Estimate the gene and trait probabilities of every person, in the
+    form of `heredity.main`, by Monte Carlo with one of METHODS:
+
+    "likelihood"  likelihood weighting: sample gene counts from parents
+                  to children and weight each sample by the probability
+                  of the known traits
+    "gibbs"       Gibbs sampling: resample each person's gene count from
+                  its distribution given their parents, children,
+                  co-parents and trait, WALKERS chains at a time
+
+    Likelihood weighting is fast but, with hundreds of known traits, a
+    few samples carry nearly all the weight. Its effective sample size
+    (ESS), (sum w)^2 / sum w^2 over the weights w, measures this; when it
+    falls below MIN_ESS, a warning is issued and Gibbs sampling is used
+    instead, which is slower per sample but stays accurate on large
+    families.
+
+    The `samples` are split over `chains` independent chains, seeded
+    from `seed` and run on a pool of `processes` workers. Returns the
+    probabilities and, in the same form, their standard errors: the
+    spread between chains, and for likelihood weighting no less than
+    the binomial error of the ESS (NaN for a single Gibbs chain). If
+    `stats` is a dict, the method used and the ESS (None for Gibbs
+    sampling) are recorded in it.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown method {method!r}, expected one of {METHODS}")
+    family = encode(people)
+    seeds = np.random.SeedSequence(seed).spawn(chains)
+    tasks = [(method, family, max(1, samples // chains), chain_seed, probs)
+             for chain_seed in seeds]
+    with Pool(processes) as pool:
+        results = pool.map(_run_chain, tasks)
+    estimates = np.array([chain for chain, _ in results])
+    ess = sum(chain_ess for _, chain_ess in results)
+    if method == "likelihood" and ess < MIN_ESS:
+        warnings.warn(f"Likelihood weighting has an effective sample size of {ess:.1f} "
+                      f"from {samples} samples; using Gibbs sampling instead",
+                      RuntimeWarning, stacklevel=2)
+        return estimate(people, "gibbs", samples, chains, seed, processes, probs, stats)
+    if stats is not None:
+        stats["method"] = method
+        stats["ess"] = ess if method == "likelihood" else None
+
+    likelihood = trait_table(probs)
+    genes = estimates.mean(axis=0)
+    trait_probabilities = genes @ likelihood[:, 1]
+    if chains > 1:
+        gene_errors = estimates.std(axis=0, ddof=1) / np.sqrt(chains)
+        trait_errors = (estimates @ likelihood[:, 1]).std(axis=0, ddof=1) / np.sqrt(chains)
+    else:
+        gene_errors = np.full_like(genes, np.nan)
+        trait_errors = np.full(len(genes), np.nan)
+    if method == "likelihood":
+        # A few chains can agree by chance, so the spread alone understates the error
+        gene_errors = np.fmax(gene_errors, np.sqrt(genes * (1 - genes) / ess))
+        trait_errors = np.fmax(trait_errors, np.sqrt(trait_probabilities * (1 - trait_probabilities) / ess))
+
+    names, _, _, traits = family
+    probabilities, errors = {}, {}
+    for i, person in enumerate(names):
+        probabilities[person] = distribution(people[person], genes[i], probs)
+        trait_error = 0.0 if traits[i] >= 0 else float(trait_errors[i])
+        errors[person] = {
+            "gene": {g: float(gene_errors[i, g]) for g in reversed(GENES)},
+            "trait": {True: trait_error, False: trait_error}
+        }
+    return probabilities, errors
+
+
+def _run_chain(task):
+    """
+    Run one chain and return its N x 3 estimate of the gene marginals
+    with its effective sample size (its sample count for Gibbs sampling,
+    which is not used).
+    """
+    method, family, samples, seed, probs = task
+    rng = np.random.default_rng(seed)
+    if method == "likelihood":
+        return likelihood_weighting(family, samples, rng, probs)
+    return gibbs(family, samples, rng, probs), samples
+
+
+def likelihood_weighting(family, samples, rng, probs=PROBS):
+    """
+    Returns the N x 3 gene marginals of an `encode`d family estimated
+    from `samples` likelihood-weighted samples, BATCH at a time, and the
+    effective sample size of their weights.
+
+    Weights are kept as logarithms relative to the largest so far, as
+    the product of thousands of trait probabilities underflows.
+    """
+    _, _, _, traits = family
+    known = traits >= 0
+    likelihood = np.log(trait_table(probs))
+
+    totals = np.zeros((len(traits), 3))
+    total, squares = 0.0, 0.0
+    largest = -np.inf
+    for start in range(0, samples, BATCH):
+        genes = forward_sample(family, min(BATCH, samples - start), rng, probs)
+        weights = likelihood[genes[:, known], traits[known]].sum(axis=1)
+        if weights.max() > largest:
+            scale = np.exp(largest - weights.max())
+            totals *= scale
+            total *= scale
+            squares *= scale ** 2
+            largest = weights.max()
+        weights = np.exp(weights - largest)
+        total += weights.sum()
+        squares += weights @ weights
+        for gene in GENES:
+            totals[:, gene] += weights @ (genes == gene)
+    return totals / totals.sum(axis=1, keepdims=True), total ** 2 / squares
+
+
+def forward_sample(family, size, rng, probs=PROBS):
+    """
+    Returns a `size` x N int8 array of gene counts of an `encode`d family
+    sampled from the prior and inheritance, ignoring traits.
+    """
+    _, mother, father, _ = family
+    table = inheritance(probs)
+    prior = np.array([probs["gene"][gene] for gene in GENES])
+    genes = np.empty((size, len(mother)), dtype=np.int8)
+    for i in topological_order(mother, father):
+        if mother[i] >= 0:
+            p = table[genes[:, mother[i]], genes[:, father[i]]]
+        else:
+            p = np.broadcast_to(prior, (size, 3))
+        genes[:, i] = _choose(p, rng)
+    return genes
+
+
+def gibbs(family, samples, rng, probs=PROBS):
+    """
+    Returns the N x 3 gene marginals of an `encode`d family estimated by
+    WALKERS Gibbs chains side by side, with `samples` recorded states in
+    total after BURN_IN sweeps each, starting from forward samples.
+    """
+    _, mother, father, traits = family
+    n = len(traits)
+    walkers = min(WALKERS, samples)
+    sweeps = -(-samples // walkers)
+    table, likelihood = inheritance(probs), trait_table(probs)
+    prior = np.array([probs["gene"][gene] for gene in GENES])
+
+    # Children of each person, with their other parent and whether the
+    # person is their mother
+    children = [[] for _ in range(n)]
+    for child in np.flatnonzero(mother >= 0).tolist():
+        children[mother[child]].append((child, father[child], True))
+        children[father[child]].append((child, mother[child], False))
+
+    genes = forward_sample(family, walkers, rng, probs)
+    counts = np.zeros((n, 3))
+    for sweep in range(BURN_IN + sweeps):
+        for i in range(n):
+            if mother[i] >= 0:
+                p = table[genes[:, mother[i]], genes[:, father[i]]]
+            else:
+                p = np.tile(prior, (walkers, 1))
+            if traits[i] >= 0:
+                p = p * likelihood[:, traits[i]]
+            for child, other, is_mother in children[i]:
+                if is_mother:
+                    p = p * table[:, genes[:, other], genes[:, child]].T
+                else:
+                    p = p * table[genes[:, other], :, genes[:, child]]
+            genes[:, i] = _choose(p, rng)
+        if sweep >= BURN_IN:
+            for gene in GENES:
+                counts[:, gene] += (genes == gene).sum(axis=0)
+    return counts / counts.sum(axis=1, keepdims=True)
+
+
+def topological_order(mother, father):
+    """
+    Returns the person indices ordered so that parents come before their
+    children.
+    """
+    n = len(mother)
+    children = [[] for _ in range(n)]
+    waiting = np.zeros(n, dtype=np.int64)
+    for child in np.flatnonzero(mother >= 0).tolist():
+        for parent in (mother[child], father[child]):
+            children[parent].append(child)
+            waiting[child] += 1
+    order = np.flatnonzero(waiting == 0).tolist()
+    for person in order:
+        for child in children[person]:
+            waiting[child] -= 1
+            if waiting[child] == 0:
+                order.append(child)
+    if len(order) < n:
+        raise ValueError("Family has a cycle of parents")
+    return order
+
+
+def _choose(p, rng):
+    """
+    Returns one gene count per row of the unnormalized 3-column
+    probabilities `p`, as int8.
+    """
+    cumulative = np.cumsum(p, axis=1)
+    u = rng.random(len(p)) * cumulative[:, -1]
+    return (u[:, None] >= cumulative[:, :2]).sum(axis=1).astype(np.int8)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import sys
+
+import numpy as np
+
+from heredity import PROBS, load_data, print_probabilities
+from inference import GENES, distribution, inheritance
+
+# Gene assignments scored per NumPy call
+CHUNK = 1 << 20
+
+
+def main():
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python vectorized.py data.csv")
+    people = load_data(sys.argv[1])
+    print_probabilities(people, marginals(people))
+
+
+def encode(people):
+    """
+    Returns the names of `people` and, by person index, int arrays of the
+    indices of their mother and father (-1 unless both are known) and an
+    int8 array of their traits (1, 0, or -1 if unknown).
+    """
+    names = list(people)
+    index = {person: i for i, person in enumerate(names)}
+    mother = np.full(len(names), -1)
+    father = np.full(len(names), -1)
+    traits = np.full(len(names), -1, dtype=np.int8)
+    for i, person in enumerate(names):
+        if people[person]["mother"] and people[person]["father"]:
+            mother[i] = index[people[person]["mother"]]
+            father[i] = index[people[person]["father"]]
+        if people[person]["trait"] is not None:
+            traits[i] = int(people[person]["trait"])
+    return names, mother, father, traits
+
+
+def joint_probabilities(people, genes, have_trait, probs=PROBS):
+    """
+    Return the joint probability of every row of assignments, like
+    `heredity.joint_probability` for each row at once. `genes` is a
+    B x N int8 array of the gene count of each person and `have_trait`
+    a B x N bool array, with people in the order of `people`.
+    """
+    _, mother, father, _ = encode(people)
+    return _gene_probabilities(genes, mother, father, probs) * \
+        trait_table(probs)[genes, have_trait.astype(np.int8)].prod(axis=1)
+
+
+def marginals(people, probs=PROBS, chunk=CHUNK):
+    """
+    Return the gene and trait probabilities of every person, in the same
+    form as `heredity.main`, by scoring all 3^N gene assignments `chunk`
+    at a time as int8 arrays.
+
+    Unknown traits are summed out rather than enumerated: they add the
+    factor P(trait | gene) to an assignment, which sums to 1 over both
+    traits. Known traits weight every assignment, so assignments that
+    contradict them score zero.
+    """
+    names, mother, father, traits = encode(people)
+    n = len(names)
+    table = trait_table(probs)
+    known = traits >= 0
+    powers = 3 ** np.arange(n, dtype=np.int64)
+    rows = np.broadcast_to(np.arange(n), (chunk, n))
+
+    gene_totals = np.zeros((n, 3))
+    for start in range(0, 3 ** n, chunk):
+        end = min(start + chunk, 3 ** n)
+        genes = (np.arange(start, end)[:, None] // powers % 3).astype(np.int8)
+        p = _gene_probabilities(genes, mother, father, probs)
+        p *= table[genes[:, known], traits[known]].prod(axis=1)
+
+        np.add.at(gene_totals, (rows[:end - start], genes), p[:, None])
+
+    # Unknown traits follow from the gene marginals, as summed out above
+    return {
+        person: distribution(people[person], gene_totals[i] / gene_totals[i].sum(), probs)
+        for i, person in enumerate(names)
+    }
+
+
+def trait_table(probs):
+    """
+    Returns the 3 x 2 table of the probability of each trait given each
+    gene count.
+    """
+    return np.array([[probs["trait"][gene][trait] for trait in (False, True)]
+                     for gene in GENES])
+
+
+def _gene_probabilities(genes, mother, father, probs):
+    """
+    Returns the probability of the gene counts in each row of `genes`,
+    from the inheritance table for children and the prior for others.
+    """
+    prior = np.array([probs["gene"][gene] for gene in GENES])
+    children = mother >= 0
+    p = prior[genes[:, ~children]].prod(axis=1)
+    p *= inheritance(probs)[
+        genes[:, mother[children]], genes[:, father[children]], genes[:, children]
+    ].prod(axis=1)
+    return p
+
+
+if __name__ == "__main__":
+    main()
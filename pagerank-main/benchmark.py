@@ -0,0 +1,475 @@
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+import crawler
+import incremental
+import outofcore
+import parallel
+import pagerank
+import personalized
+import solvers
+from graph import LinkGraph
+
+# Largest graph the O(N^2) dict implementation is run on for comparison
+REFERENCE_PAGES = 1000
+
+# Tolerance of the reference ranks that the suite measures errors against
+REFERENCE_TOLERANCE = 1e-13
+
+# Settings compared by the suite: sample counts and power iteration tolerances
+SUITE_SAMPLES = (10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6)
+SUITE_TOLERANCES = (1e-3, 1e-4, 1e-6, 1e-8)
+
+
+def main():
+    if len(sys.argv) < 2:
+        sys.exit("Usage: python benchmark.py sparse|sampler|crawl|incremental|personalized|solvers|outofcore|parallel|suite [args]")
+    command = sys.argv[1]
+    if command == "sparse":
+        max_pages = int(sys.argv[2]) if len(sys.argv) > 2 else 10 ** 6
+        benchmark_sparse(max_pages)
+    elif command == "sampler":
+        samples = int(sys.argv[2]) if len(sys.argv) > 2 else 10 ** 7
+        pages = int(sys.argv[3]) if len(sys.argv) > 3 else 10 ** 5
+        benchmark_sampler(samples, pages)
+    elif command == "crawl":
+        directory = sys.argv[2] if len(sys.argv) > 2 else "synthetic"
+        pages = int(sys.argv[3]) if len(sys.argv) > 3 else 10 ** 5
+        processes = int(sys.argv[4]) if len(sys.argv) > 4 else None
+        benchmark_crawl(directory, pages, processes)
+    elif command == "incremental":
+        pages = int(sys.argv[2]) if len(sys.argv) > 2 else 10 ** 5
+        fraction = float(sys.argv[3]) if len(sys.argv) > 3 else 0.01
+        benchmark_incremental(pages, fraction)
+    elif command == "personalized":
+        pages = int(sys.argv[2]) if len(sys.argv) > 2 else 10 ** 5
+        seeds = int(sys.argv[3]) if len(sys.argv) > 3 else 64
+        benchmark_personalized(pages, seeds)
+    elif command == "solvers":
+        pages = int(sys.argv[2]) if len(sys.argv) > 2 else 10 ** 5
+        norm = sys.argv[3] if len(sys.argv) > 3 else "l1"
+        benchmark_solvers(pages, norm)
+    elif command == "outofcore":
+        directory = sys.argv[2] if len(sys.argv) > 2 else "synthetic"
+        pages = int(sys.argv[3]) if len(sys.argv) > 3 else 10 ** 6
+        block = int(sys.argv[4]) if len(sys.argv) > 4 else outofcore.BLOCK
+        benchmark_outofcore(directory, pages, block)
+    elif command == "parallel":
+        pages = int(sys.argv[2]) if len(sys.argv) > 2 else 10 ** 6
+        processes = int(sys.argv[3]) if len(sys.argv) > 3 else os.cpu_count()
+        benchmark_parallel(pages, processes)
+    elif command == "suite":
+        output = sys.argv[2] if len(sys.argv) > 2 else "benchmark.json"
+        max_pages = int(sys.argv[3]) if len(sys.argv) > 3 else 10 ** 5
+        baseline = sys.argv[4] if len(sys.argv) > 4 else None
+        benchmark_suite(output, max_pages, baseline)
+    else:
+        sys.exit(f"Unknown benchmark: {command}")
+
+
+def benchmark_sparse(max_pages, degree=8, seed=0):
+    """
+    Time sparse power iteration on synthetic graphs of 10^3 pages up to
+    `max_pages`, checking it against `iterate_pagerank` on small graphs.
+    """
+    n = 1000
+    while n <= max_pages:
+        start = time.perf_counter()
+        graph = LinkGraph.random(n, degree, seed)
+        built = time.perf_counter() - start
+
+        start = time.perf_counter()
+        ranks, iterations = pagerank.power_iteration(graph, pagerank.DAMPING)
+        elapsed = time.perf_counter() - start
+
+        print(f"{n} pages, {len(graph.indices)} links, "
+              f"{len(graph.dangling)} dangling:")
+        print(f"  Build: {format_seconds(built)}")
+        print(f"  Power iteration: {format_seconds(elapsed)} "
+              f"({iterations} sweeps, {format_seconds(elapsed / iterations)} per sweep)")
+
+        if n <= REFERENCE_PAGES:
+            corpus = graph.to_corpus()
+            start = time.perf_counter()
+            expected = pagerank.iterate_pagerank(corpus, pagerank.DAMPING)
+            reference = time.perf_counter() - start
+            error = max(abs(expected[page] - rank)
+                        for page, rank in graph.to_dict(ranks).items())
+            print(f"  iterate_pagerank: {format_seconds(reference)} "
+                  f"(max difference {error:.2e})")
+        n *= 10
+
+    # A corpus without links has no edges at all, and every page is dangling
+    corpus = {f"{i}.html": set() for i in range(10)}
+    expected = pagerank.iterate_pagerank(corpus, pagerank.DAMPING)
+    ranks = pagerank.iterate_pagerank_sparse(corpus, pagerank.DAMPING)
+    error = max(abs(expected[page] - ranks[page]) for page in corpus)
+    print(f"{len(corpus)} pages, 0 links:")
+    print(f"  iterate_pagerank_sparse: max difference {error:.2e}")
+
+
+def benchmark_sampler(samples, pages, degree=8, seed=0):
+    """
+    Compare `sample_pagerank` with the vectorized sampler on corpus2,
+    then time `samples` vectorized samples on a synthetic graph of
+    `pages` pages, measuring L1 error against power iteration.
+    """
+    corpus = pagerank.crawl("corpus2")
+    start = time.perf_counter()
+    pagerank.sample_pagerank(corpus, pagerank.DAMPING, pagerank.SAMPLES)
+    loop = time.perf_counter() - start
+    start = time.perf_counter()
+    pagerank.sample_pagerank_vectorized(corpus, pagerank.DAMPING, pagerank.SAMPLES, seed=seed)
+    vectorized = time.perf_counter() - start
+    print(f"corpus2, {pagerank.SAMPLES} samples:")
+    print(f"  sample_pagerank: {format_seconds(loop)}")
+    print(f"  Vectorized: {format_seconds(vectorized)}")
+
+    graph = LinkGraph.random(pages, degree, seed)
+    exact, _ = pagerank.power_iteration(graph, pagerank.DAMPING)
+    start = time.perf_counter()
+    counts = pagerank.random_walks(graph, pagerank.DAMPING, samples, seed=seed)
+    elapsed = time.perf_counter() - start
+    error = np.abs(counts / samples - exact).sum()
+    print(f"{pages} pages, {samples} samples with {pagerank.WALKERS} walkers:")
+    print(f"  Vectorized: {format_seconds(elapsed)} "
+          f"({samples / elapsed:,.0f} samples/s, L1 error {error:.4f})")
+
+
+def benchmark_crawl(directory, pages, processes=None, seed=0):
+    """
+    Time `pagerank.crawl` against the parallel crawler, uncached and
+    cached, on a corpus of `pages` synthetic pages written to `directory`
+    if it does not exist yet.
+    """
+    if not os.path.isdir(directory):
+        print(f"Writing {pages} pages to {directory}...")
+        write_corpus(directory, LinkGraph.random(pages, seed=seed))
+
+    start = time.perf_counter()
+    expected = pagerank.crawl(directory)
+    serial = time.perf_counter() - start
+    print(f"pagerank.crawl: {format_seconds(serial)} "
+          f"({len(expected) / serial:,.0f} files/s)")
+
+    graph, stats = crawler.crawl_graph(directory, processes, use_cache=False)
+    print(f"Parallel crawl: {format_seconds(stats['seconds'])} "
+          f"({stats['files'] / stats['seconds']:,.0f} files/s)")
+    graph, stats = crawler.crawl_graph(directory, processes)
+    print(f"Cached: {format_seconds(stats['seconds'])}")
+
+    if graph.to_corpus() != expected:
+        sys.exit("Link graphs differ between crawlers.")
+    print("Link graphs agree.")
+
+
+def benchmark_incremental(pages, fraction, degree=8, seed=0):
+    """
+    Rewire the links of `fraction` of the pages of a synthetic graph and
+    add as many new pages, then compare a warm-started update with a
+    cold start.
+    """
+    rng = np.random.default_rng(seed)
+    old = LinkGraph.random(pages, degree, seed)
+    old_ranks, _ = pagerank.power_iteration(old, pagerank.DAMPING)
+
+    # Rewired pages get fresh random links, and new pages link at random
+    changed = max(1, int(pages * fraction))
+    total = pages + changed
+    sources = np.repeat(np.arange(pages), old.out_degree)
+    targets = old.indices.astype(np.int64)
+    rewired = rng.choice(pages, changed, replace=False)
+    keep = ~np.isin(sources, rewired)
+    fresh = np.concatenate([rewired, np.arange(pages, total)])
+    counts = rng.poisson(degree, len(fresh))
+    sources = np.concatenate([sources[keep], np.repeat(fresh, counts)])
+    targets = np.concatenate([targets[keep], rng.integers(0, total, counts.sum())])
+    # Zero-pad names so the new pages still sort after the old ones
+    names = [f"{i:09d}.html" for i in range(total)]
+    old.pages = names[:pages]
+    new = LinkGraph.from_edges(names, sources, targets)
+
+    ranks, report = incremental.update(old, old_ranks, new, pagerank.DAMPING)
+    print(f"{pages} pages, {len(report['added'])} added, "
+          f"{len(report['changed'])} changed:")
+    print(f"  Finding changes: {format_seconds(report['diff_seconds'])}")
+    print(f"  Warm start: {report['iterations']} iterations "
+          f"in {format_seconds(report['seconds'])}")
+    print(f"  Cold start: {report['cold_iterations']} iterations "
+          f"in {format_seconds(report['cold_seconds'])}")
+
+
+def benchmark_personalized(pages, seeds, degree=8, seed=0):
+    """
+    Compare personalized PageRank for `seeds` single-page seed sets in
+    one batch against one run per seed, and forward push against the
+    exact ranks for the first seed.
+    """
+    rng = np.random.default_rng(seed)
+    graph = LinkGraph.random(pages, degree, seed)
+    chosen = rng.choice(pages, seeds, replace=False)
+    teleport = np.zeros((pages, seeds))
+    teleport[chosen, np.arange(seeds)] = 1
+
+    start = time.perf_counter()
+    ranks, iterations = personalized.personalized_pagerank(
+        graph, teleport, pagerank.DAMPING
+    )
+    batched = time.perf_counter() - start
+    start = time.perf_counter()
+    for column in range(seeds):
+        personalized.personalized_pagerank(
+            graph, teleport[:, column:column + 1], pagerank.DAMPING
+        )
+    separate = time.perf_counter() - start
+    print(f"{pages} pages, {seeds} seeds:")
+    print(f"  Batched: {format_seconds(batched)} ({iterations} sweeps)")
+    print(f"  One at a time: {format_seconds(separate)}")
+
+    corpus = graph.to_corpus()
+    index = {page: i for i, page in enumerate(graph.pages)}
+    for epsilon in (1e-4, 1e-5, 1e-6):
+        start = time.perf_counter()
+        estimate = personalized.forward_push(
+            corpus, graph.pages[chosen[0]], pagerank.DAMPING, epsilon
+        )
+        elapsed = time.perf_counter() - start
+        approximate = np.zeros(pages)
+        approximate[[index[page] for page in estimate]] = list(estimate.values())
+        error = np.abs(approximate - ranks[:, 0]).sum()
+        print(f"  Forward push, epsilon {epsilon:g}: {format_seconds(elapsed)} "
+              f"({len(estimate)} pages touched, L1 error {error:.4f})")
+
+
+def benchmark_solvers(pages, norm="l1", degree=8, seed=0):
+    """
+    Compare iterations and time of every solver method on the sample
+    corpora and a synthetic graph of `pages` pages.
+    """
+    graphs = {
+        corpus: LinkGraph.from_corpus(pagerank.crawl(corpus))
+        for corpus in ("corpus0", "corpus1", "corpus2")
+    }
+    graphs[f"random {pages}"] = LinkGraph.random(pages, degree, seed)
+    for name, graph in graphs.items():
+        print(f"{name}:")
+        for method in solvers.METHODS:
+            _, diagnostics = solvers.solve(graph, pagerank.DAMPING, method, norm=norm)
+            print(f"  {method}: {diagnostics['iterations']} iterations "
+                  f"in {format_seconds(diagnostics['seconds'])}")
+
+
+def benchmark_outofcore(directory, pages, block, degree=8, seed=0):
+    """
+    Compare peak traced memory and time of out-of-core iteration with
+    in-memory power iteration on a synthetic graph of `pages` pages,
+    written to the crawler cache of `directory` if not there yet.
+    """
+    if not crawler.is_cached(directory):
+        print(f"Writing {pages} pages to {crawler.path_for(directory)}...")
+        outofcore.write_random(directory, pages, degree, seed)
+    indptr, indices = outofcore.open_edges(directory)
+    pages, links = len(indptr) - 1, len(indices)
+    print(f"{pages} pages, {links} links:")
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    ranks, iterations = outofcore.power_iteration(
+        indptr, indices, pagerank.DAMPING, block=block
+    )
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  Out-of-core: {format_seconds(elapsed)} ({iterations} sweeps), "
+          f"peak {peak / 2 ** 20:.1f} MiB "
+          f"(ceiling {outofcore.memory_ceiling(pages, links, block) / 2 ** 20:.1f} MiB, "
+          f"{outofcore.io_per_iteration(pages, links) / 2 ** 20:.1f} MiB read per sweep)")
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    graph = crawler.load(directory)
+    expected, iterations = pagerank.power_iteration(graph, pagerank.DAMPING)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  In memory: {format_seconds(elapsed)} ({iterations} sweeps), "
+          f"peak {peak / 2 ** 20:.1f} MiB")
+    print(f"  L1 difference: {np.abs(ranks - expected).sum():.2e}")
+
+
+def benchmark_parallel(pages, max_processes, degree=10, seed=0):
+    """
+    Time block-partitioned parallel iteration with 1 to `max_processes`
+    workers on a synthetic graph, checking the ranks never change.
+    """
+    graph = LinkGraph.random(pages, degree, seed)
+    print(f"{pages} pages, {len(graph.indices)} links "
+          f"({os.cpu_count()} cores available):")
+    start = time.perf_counter()
+    expected, _ = pagerank.power_iteration(graph, pagerank.DAMPING)
+    serial = time.perf_counter() - start
+    print(f"  Serial: {format_seconds(serial)}")
+
+    processes = 1
+    while processes <= max_processes:
+        start = time.perf_counter()
+        ranks, iterations = parallel.power_iteration(
+            graph, pagerank.DAMPING, processes=processes
+        )
+        elapsed = time.perf_counter() - start
+        same = "identical" if np.array_equal(ranks, expected) else \
+            f"L1 difference {np.abs(ranks - expected).sum():.2e}"
+        print(f"  {processes} processes: {format_seconds(elapsed)} "
+              f"({serial / elapsed:.2f}x serial, {same})")
+        processes *= 2
+
+
+def benchmark_suite(output, max_pages, baseline=None, degree=8, seed=0):
+    """
+    Measure the time, peak memory and L1 error of every method and
+    setting on the sample corpora and on power-law graphs of 10^3 pages
+    up to `max_pages`, against ranks converged to REFERENCE_TOLERANCE.
+
+    Results are written to the JSON file `output`. If `baseline` names
+    the JSON file of an earlier run, results are compared with it.
+    """
+    graphs = {
+        corpus: LinkGraph.from_corpus(pagerank.crawl(corpus))
+        for corpus in ("corpus0", "corpus1", "corpus2")
+    }
+    n = 1000
+    while n <= max_pages:
+        graphs[f"power-law {n}"] = LinkGraph.power_law(n, degree, seed=seed)
+        n *= 10
+
+    results = []
+    for name, graph in graphs.items():
+        print(f"{name}: {len(graph)} pages, {len(graph.indices)} links")
+        reference, _ = solvers.solve(graph, pagerank.DAMPING, tolerance=REFERENCE_TOLERANCE)
+        for method, setting, run in suite_runs(graph, seed):
+            ranks, seconds, peak = measure(run)
+            result = {
+                "graph": name,
+                "pages": len(graph),
+                "links": len(graph.indices),
+                "method": method,
+                "setting": setting,
+                "seconds": seconds,
+                "peak_bytes": peak,
+                "l1_error": float(np.abs(ranks - reference).sum())
+            }
+            results.append(result)
+            print(f"  {method} {setting}: {format_seconds(seconds)}, "
+                  f"{peak / 2 ** 20:.2f} MiB, L1 error {result['l1_error']:.2e}")
+
+    with open(output, "w") as f:
+        json.dump({
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "damping": pagerank.DAMPING,
+            "reference_tolerance": REFERENCE_TOLERANCE,
+            "results": results
+        }, f, indent=2)
+    print(f"Results written to {output}")
+    if baseline is not None:
+        compare(baseline, results)
+
+
+def suite_runs(graph, seed=0):
+    """
+    Yield (method, setting, run) for every configuration measured by
+    `benchmark_suite` on `graph`, where `run` returns the ranks as an
+    array by page index.
+    """
+    def by_index(ranks):
+        return np.array([ranks[page] for page in graph.pages])
+
+    if len(graph) <= REFERENCE_PAGES:
+        corpus = graph.to_corpus()
+        for samples in SUITE_SAMPLES[:2]:
+            yield "sample_pagerank", {"samples": samples}, \
+                lambda samples=samples: by_index(
+                    pagerank.sample_pagerank(corpus, pagerank.DAMPING, samples))
+        yield "iterate_pagerank", {}, \
+            lambda: by_index(pagerank.iterate_pagerank(corpus, pagerank.DAMPING))
+
+    for samples in SUITE_SAMPLES:
+        yield "random_walks", {"samples": samples, "walkers": pagerank.WALKERS}, \
+            lambda samples=samples: pagerank.random_walks(
+                graph, pagerank.DAMPING, samples, seed=seed) / samples
+    for tolerance in SUITE_TOLERANCES:
+        yield "power_iteration", {"tolerance": tolerance}, \
+            lambda tolerance=tolerance: pagerank.power_iteration(
+                graph, pagerank.DAMPING, tolerance)[0]
+    for method in solvers.METHODS:
+        yield f"solvers.{method}", {"tolerance": pagerank.TOLERANCE}, \
+            lambda method=method: solvers.solve(graph, pagerank.DAMPING, method)[0]
+
+
+def measure(run):
+    """
+    Call `run` twice: once timed, and once with tracemalloc, whose
+    overhead would distort the timing. Returns the result of the timed
+    call, its duration in seconds and the peak bytes allocated.
+    """
+    start = time.perf_counter()
+    result = run()
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+def compare(baseline, results):
+    """
+    Print how the time and error of each result changed from the JSON
+    file `baseline` of an earlier `benchmark_suite` run.
+    """
+    with open(baseline) as f:
+        previous = {
+            (result["graph"], result["method"], json.dumps(result["setting"], sort_keys=True)): result
+            for result in json.load(f)["results"]
+        }
+    print(f"Compared with {baseline}:")
+    for result in results:
+        key = (result["graph"], result["method"], json.dumps(result["setting"], sort_keys=True))
+        if key not in previous:
+            continue
+        before = previous[key]
+        print(f"  {result['graph']} {result['method']} {result['setting']}: "
+              f"{result['seconds'] / max(before['seconds'], 1e-9):.2f}x time, "
+              f"L1 error {before['l1_error']:.2e} -> {result['l1_error']:.2e}")
+
+
+def write_corpus(directory, graph):
+    """
+    Write a `LinkGraph` as a directory of HTML pages.
+    """
+    os.makedirs(directory)
+    for i, page in enumerate(graph.pages):
+        links = "".join(
+            f'    <li><a href="{graph.pages[j]}">{graph.pages[j]}</a></li>\n'
+            for j in graph.indices[graph.indptr[i]:graph.indptr[i + 1]].tolist()
+        )
+        with open(os.path.join(directory, page), "w") as f:
+            f.write(f"<!DOCTYPE html>\n<html>\n<body>\n<ul>\n{links}</ul>\n"
+                    f"</body>\n</html>\n")
+
+
+def format_seconds(seconds):
+    if seconds < 1:
+        return f"{1000 * seconds:.2f}ms"
+    return f"{seconds:.2f}s"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from multiprocessing import Pool
+
+import numpy as np
+
+from graph import LinkGraph
+
+# Bump when the on-disk layout changes so old caches are rebuilt
+VERSION = 1
+
+# Bytes read from a page at a time
+CHUNK = 1 << 16
+
+# Bytes carried over between chunks; longer <a> tags that straddle
+# a chunk boundary can be missed
+OVERLAP = 4096
+
+# Pages parsed per task sent to a worker
+BATCH = 512
+
+LINK = re.compile(rb"<a\s+(?:[^>]*?)href=\"([^\"]*)\"")
+
+
+def main():
+    if len(sys.argv) not in (2, 3):
+        sys.exit("Usage: python crawler.py corpus [processes]")
+    directory = sys.argv[1]
+    processes = int(sys.argv[2]) if len(sys.argv) == 3 else None
+
+    graph, stats = crawl_graph(directory, processes)
+    if stats["cached"]:
+        print(f"Loaded {len(graph)} pages from {path_for(directory)} "
+              f"in {stats['seconds']:.2f}s")
+    else:
+        print(f"Crawled {stats['files']} files in {stats['seconds']:.2f}s "
+              f"({stats['files'] / max(stats['seconds'], 1e-9):,.0f} files/s, "
+              f"{stats['bytes'] / max(stats['seconds'], 1e-9) / 2 ** 20:.1f} MiB/s)")
+        print(f"Link graph written to {path_for(directory)}.")
+    print(f"{len(graph)} pages, {len(graph.indices)} links")
+
+
+def path_for(directory):
+    """
+    Returns the directory holding the cached link graph of a corpus.
+    """
+    return os.path.join(directory, ".links")
+
+
+def crawl(directory, processes=None):
+    """
+    Return the same dictionary as `pagerank.crawl`, using the cached or
+    parallel crawl of `crawl_graph`.
+    """
+    graph, _ = crawl_graph(directory, processes)
+    return graph.to_corpus()
+
+
+def crawl_graph(directory, processes=None, use_cache=True):
+    """
+    Parse the HTML pages of `directory` on a pool of `processes` workers
+    and return the link graph with crawl statistics.
+
+    The graph is written to `path_for(directory)` and reused while the
+    names, sizes and modification times of the pages are unchanged.
+    """
+    start = time.perf_counter()
+    filenames, fingerprint = listing(directory)
+    if use_cache:
+        graph = load(directory, fingerprint)
+        if graph is not None:
+            return graph, {"cached": True, "files": len(filenames), "bytes": 0,
+                           "seconds": time.perf_counter() - start}
+
+    batches = [
+        (start, min(start + BATCH, len(filenames)))
+        for start in range(0, len(filenames), BATCH)
+    ]
+    sources, targets = [], []
+    size = 0
+    with Pool(processes, initializer=_init_worker,
+              initargs=(directory, filenames)) as pool:
+        for batch_sources, batch_targets, batch_bytes in pool.imap_unordered(
+            parse_batch, batches
+        ):
+            sources.append(batch_sources)
+            targets.append(batch_targets)
+            size += batch_bytes
+
+    graph = LinkGraph.from_edges(
+        filenames,
+        np.concatenate(sources) if sources else [],
+        np.concatenate(targets) if targets else []
+    )
+    save(directory, graph, fingerprint)
+    return graph, {"cached": False, "files": len(filenames), "bytes": size,
+                   "seconds": time.perf_counter() - start}
+
+
+def _init_worker(directory, pages):
+    """
+    Give each worker the corpus and the index of every page in it.
+    """
+    global worker_directory, worker_pages, worker_index
+    worker_directory = directory
+    worker_pages = pages
+    worker_index = {page: i for i, page in enumerate(pages)}
+
+
+def parse_batch(batch):
+    """
+    Parse pages `start` to `end` of the corpus in a worker.
+    Returns arrays of link sources and targets as page indices, keeping
+    only links to other pages in the corpus, and the bytes read.
+    """
+    start, end = batch
+    sources, targets = [], []
+    size = 0
+    for i in range(start, end):
+        _, links, page_bytes = parse(os.path.join(worker_directory, worker_pages[i]))
+        size += page_bytes
+        found = [j for j in map(worker_index.get, links) if j is not None]
+        sources.extend([i] * len(found))
+        targets.extend(found)
+    return (np.array(sources, dtype=np.int32), np.array(targets, dtype=np.int32), size)
+
+
+def parse(path):
+    """
+    Returns the filename of a page, the set of links it contains and
+    its size in bytes, reading it CHUNK bytes at a time.
+    """
+    links = set()
+    carry = b""
+    size = 0
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(CHUNK)
+            if not chunk:
+                break
+            size += len(chunk)
+            text = carry + chunk
+            links.update(LINK.findall(text))
+            carry = text[-OVERLAP:]
+    filename = os.path.basename(path)
+    links = {link.decode("utf-8", errors="replace") for link in links}
+    return filename, links - {filename}, size
+
+
+def listing(directory):
+    """
+    Returns the sorted .html filenames of a corpus and a fingerprint of
+    their names, sizes and modification times.
+    """
+    entries = []
+    with os.scandir(directory) as it:
+        for entry in it:
+            if entry.name.endswith(".html") and entry.is_file():
+                stat = entry.stat()
+                entries.append((entry.name, stat.st_size, stat.st_mtime_ns))
+    entries.sort()
+    digest = hashlib.sha256()
+    for name, size, mtime in entries:
+        digest.update(f"{name}\0{size}\0{mtime}\n".encode("utf-8"))
+    return [name for name, _, _ in entries], digest.hexdigest()
+
+
+def save(directory, graph, fingerprint):
+    """
+    Write `graph` to `path_for(directory)` as its page names and CSR
+    arrays: int64 row offsets and int32 link targets, 4 bytes per link.
+    The targets are the source-sorted edge list that outofcore.py streams.
+    """
+    path = path_for(directory)
+    os.makedirs(path, exist_ok=True)
+    # Ranks saved by incremental.py belong to the graph being replaced
+    if os.path.exists(os.path.join(path, "ranks.npy")):
+        os.remove(os.path.join(path, "ranks.npy"))
+    with open(os.path.join(path, "pages.txt"), "w", encoding="utf-8") as f:
+        for page in graph.pages:
+            f.write(page + "\n")
+    np.save(os.path.join(path, "indptr.npy"), graph.indptr)
+    np.save(os.path.join(path, "indices.npy"), graph.indices)
+    write_manifest(directory, fingerprint)
+
+
+def write_manifest(directory, fingerprint):
+    """
+    Mark the graph in `path_for(directory)` as complete and crawled from
+    the pages matching `fingerprint`.
+    """
+    with open(os.path.join(path_for(directory), "manifest.json"), "w") as f:
+        json.dump({"version": VERSION, "fingerprint": fingerprint}, f)
+
+
+def is_cached(directory, fingerprint=None):
+    """
+    Returns True if `directory` has a cached graph in the current layout,
+    crawled from the pages matching `fingerprint` if given.
+    """
+    try:
+        with open(os.path.join(path_for(directory), "manifest.json")) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return False
+    if manifest.get("version") != VERSION:
+        return False
+    return fingerprint is None or manifest.get("fingerprint") == fingerprint
+
+
+def is_synthetic(directory):
+    """
+    Returns True if `directory` has a cached graph in the current layout
+    that was generated rather than crawled, such as by
+    `outofcore.write_random`, so there are no pages to check it against.
+    """
+    try:
+        with open(os.path.join(path_for(directory), "manifest.json")) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return manifest.get("version") == VERSION and manifest.get("fingerprint") is None
+
+
+def load(directory, fingerprint=None):
+    """
+    Load the cached graph of `directory`, or return None if there is
+    none or it was crawled from different pages than `fingerprint`.
+    """
+    if not is_cached(directory, fingerprint):
+        return None
+    path = path_for(directory)
+    with open(os.path.join(path, "pages.txt"), encoding="utf-8") as f:
+        pages = f.read().splitlines()
+    return LinkGraph(
+        pages,
+        np.load(os.path.join(path, "indptr.npy")),
+        np.load(os.path.join(path, "indices.npy"))
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import numpy as np
+import scipy.sparse
+
+
+class LinkGraph():
+    """
+    Link structure of a corpus over dense page indices.
+
+    `pages[i]` is the filename of page `i`, and page `i` links to the
+    pages `indices[indptr[i]:indptr[i + 1]]`, sorted, each at most once
+    and never to itself.
+    """
+
+    def __init__(self, pages, indptr, indices):
+        self.pages = pages
+        self.indptr = indptr
+        self.indices = indices
+
+    @classmethod
+    def from_corpus(cls, corpus):
+        """
+        Build a graph from the dict returned by `pagerank.crawl`.
+        """
+        pages = sorted(corpus)
+        index = {page: i for i, page in enumerate(pages)}
+        sources, targets = [], []
+        for i, page in enumerate(pages):
+            for link in corpus[page]:
+                sources.append(i)
+                targets.append(index[link])
+        return cls.from_edges(pages, sources, targets)
+
+    @classmethod
+    def from_edges(cls, pages, sources, targets):
+        """
+        Build a graph from parallel arrays of page indices, one entry per
+        link. Repeated links and links from a page to itself are dropped.
+        """
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        n = len(pages)
+        keep = sources != targets
+        keys = np.sort(sources[keep] * n + targets[keep])
+        if len(keys):
+            keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+        sources, targets = np.divmod(keys, n)
+
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=n), out=indptr[1:])
+        return cls(pages, indptr, targets.astype(np.int32))
+
+    @classmethod
+    def random(cls, n, degree=8, seed=0):
+        """
+        Returns a synthetic graph of `n` pages whose out-degrees are
+        Poisson with mean `degree` and whose links point to uniformly
+        random pages, so some pages have no links at all.
+        """
+        rng = np.random.default_rng(seed)
+        counts = rng.poisson(degree, n)
+        sources = np.repeat(np.arange(n), counts)
+        targets = rng.integers(0, n, len(sources))
+        pages = [f"{i}.html" for i in range(n)]
+        return cls.from_edges(pages, sources, targets)
+
+    @classmethod
+    def power_law(cls, n, degree=8, exponent=2.1, seed=0):
+        """
+        Returns a synthetic graph of `n` pages like `random`, but whose
+        links favour popular pages, so in-degrees follow a power law
+        with about `exponent` as on the web.
+        """
+        rng = np.random.default_rng(seed)
+        counts = rng.poisson(degree, n)
+        sources = np.repeat(np.arange(n), counts)
+        # The page of popularity rank r is linked with weight r^(-1/(exponent-1))
+        weights = np.arange(1, n + 1) ** (-1 / (exponent - 1))
+        popularity = np.cumsum(weights[rng.permutation(n)])
+        targets = np.searchsorted(popularity, rng.random(len(sources)) * popularity[-1],
+                                  side="right")
+        targets = np.minimum(targets, n - 1)
+        pages = [f"{i}.html" for i in range(n)]
+        return cls.from_edges(pages, sources, targets)
+
+    def __len__(self):
+        return len(self.pages)
+
+    @property
+    def out_degree(self):
+        """
+        Number of links from each page.
+        """
+        return np.diff(self.indptr)
+
+    @property
+    def dangling(self):
+        """
+        Indices of the pages with no links. The random surfer treats them
+        as linking to every page in the corpus.
+        """
+        return np.flatnonzero(self.out_degree == 0)
+
+    def transition(self):
+        """
+        Returns the sparse matrix `M` with `M[j, i] = 1 / out_degree[i]`
+        for each link from page `i` to page `j`, so that `M @ ranks` is
+        the rank flowing along links. Columns of dangling pages are zero.
+        """
+        n = len(self.pages)
+        out_degree = self.out_degree
+        weights = np.repeat(1 / np.maximum(out_degree, 1), out_degree)
+        # Read as CSC, the out-link CSR arrays are already the transpose
+        matrix = scipy.sparse.csc_matrix(
+            (weights, self.indices, self.indptr), shape=(n, n)
+        )
+        return matrix.tocsr()
+
+    def to_corpus(self):
+        """
+        Returns the dict form of the graph, as `pagerank.crawl` returns.
+        """
+        pages = self.pages
+        return {
+            page: {pages[j] for j in self.indices[self.indptr[i]:self.indptr[i + 1]].tolist()}
+            for i, page in enumerate(pages)
+        }
+
+    def to_dict(self, ranks):
+        """
+        Returns a dict mapping each page to its value in `ranks`.
+        """
+        return dict(zip(self.pages, np.asarray(ranks).tolist()))
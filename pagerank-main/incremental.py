@@ -0,0 +1,161 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+import crawler
+import pagerank
+
+
+def main():
+    if len(sys.argv) not in (2, 3):
+        sys.exit("Usage: python incremental.py corpus [processes]")
+    directory = sys.argv[1]
+    processes = int(sys.argv[2]) if len(sys.argv) == 3 else None
+
+    # Read the previous graph and ranks before the crawl replaces them
+    old = crawler.load(directory)
+    old_ranks = load_ranks(directory) if old is not None else None
+    graph, _ = crawler.crawl_graph(directory, processes)
+
+    if old_ranks is None:
+        print("No previous ranks, starting cold.")
+        start = time.perf_counter()
+        ranks, iterations = pagerank.power_iteration(graph, pagerank.DAMPING)
+        print(f"{iterations} iterations in {time.perf_counter() - start:.3f}s")
+    else:
+        ranks, report = update(old, old_ranks, graph, pagerank.DAMPING)
+        print(f"{len(report['added'])} pages added, "
+              f"{len(report['removed'])} removed, "
+              f"{len(report['changed'])} changed "
+              f"(found in {report['diff_seconds']:.3f}s)")
+        print(f"Warm start: {report['iterations']} iterations "
+              f"in {report['seconds']:.3f}s")
+        print(f"Cold start: {report['cold_iterations']} iterations "
+              f"in {report['cold_seconds']:.3f}s")
+        print(f"Saved {report['cold_iterations'] - report['iterations']} "
+              f"iterations and {report['cold_seconds'] - report['seconds']:.3f}s")
+    save_ranks(directory, ranks)
+
+    print("PageRank Results from Iteration")
+    for page, rank in sorted(graph.to_dict(ranks).items())[:20]:
+        print(f"  {page}: {rank:.4f}")
+    if len(graph) > 20:
+        print(f"  ... {len(graph) - 20} more")
+
+
+def changes(old, new, mapping=None):
+    """
+    Compare two `LinkGraph`s of a corpus by page name.
+    Returns a dict of the sorted names of pages that were "added",
+    "removed", or kept but "changed" their links.
+    """
+    n = len(new)
+    if mapping is None:
+        mapping = page_mapping(old, new)
+    added = np.ones(n, dtype=bool)
+    added[mapping[mapping < n]] = False
+
+    # Links as (source, target) keys in new page indices; a link from a
+    # kept page to a removed one has target n and so never matches
+    old_sources = np.repeat(mapping, old.out_degree)
+    old_keys = old_sources * (n + 1) + mapping[old.indices]
+    new_keys = np.repeat(np.arange(n), new.out_degree) * (n + 1) + new.indices
+    keys = np.sort(np.concatenate([old_keys[old_sources < n], new_keys]))
+
+    # Each graph lists a link once, so links in only one of them occur once
+    repeated = keys[1:] == keys[:-1]
+    once = np.ones(len(keys), dtype=bool)
+    once[1:] &= ~repeated
+    once[:-1] &= ~repeated
+    differing = keys[once] // (n + 1)
+    differing = differing[np.diff(differing, prepend=-1) != 0]
+    changed = differing[~added[differing]]
+
+    pages = np.array(new.pages)
+    return {
+        "added": sorted(pages[added].tolist()),
+        "removed": sorted(np.array(old.pages)[mapping == n].tolist()),
+        "changed": sorted(pages[changed].tolist())
+    }
+
+
+def page_mapping(old, new):
+    """
+    Returns the index in `new` of each page of `old`, or len(new) for
+    pages that were removed.
+    """
+    old_pages, new_pages = np.array(old.pages), np.array(new.pages)
+    order = np.argsort(new_pages)
+    position = np.searchsorted(new_pages, old_pages, sorter=order)
+    found = position < len(new_pages)
+    found[found] = new_pages[order[position[found]]] == old_pages[found]
+    mapping = np.full(len(old_pages), len(new_pages), dtype=np.int64)
+    mapping[found] = order[position[found]]
+    return mapping
+
+
+def warm_start(old, old_ranks, new, mapping=None):
+    """
+    Returns starting ranks for `new` from the ranks of `old`: kept pages
+    keep their old rank and added pages start at 1/N.
+    """
+    if mapping is None:
+        mapping = page_mapping(old, new)
+    kept = mapping < len(new)
+    start = np.full(len(new), 1 / len(new))
+    start[mapping[kept]] = np.asarray(old_ranks)[kept]
+    return start / start.sum()
+
+
+def update(old, old_ranks, new, damping_factor, tolerance=pagerank.TOLERANCE,
+           compare=True):
+    """
+    Recompute PageRank for `new` after a corpus changed, warm-starting
+    power iteration from the ranks of the `old` graph.
+
+    Returns the ranks and a report of the page changes, the time spent
+    finding them, the iterations and time taken, and, if `compare` is
+    set, those of a cold start.
+    """
+    start = time.perf_counter()
+    mapping = page_mapping(old, new)
+    report = changes(old, new, mapping)
+    initial = warm_start(old, old_ranks, new, mapping)
+    report["diff_seconds"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ranks, report["iterations"] = pagerank.power_iteration(
+        new, damping_factor, tolerance, start=initial
+    )
+    report["seconds"] = time.perf_counter() - start
+
+    if compare:
+        start = time.perf_counter()
+        _, report["cold_iterations"] = pagerank.power_iteration(
+            new, damping_factor, tolerance
+        )
+        report["cold_seconds"] = time.perf_counter() - start
+    return ranks, report
+
+
+def save_ranks(directory, ranks):
+    """
+    Save ranks next to the cached link graph they were computed from.
+    """
+    np.save(os.path.join(crawler.path_for(directory), "ranks.npy"), ranks)
+
+
+def load_ranks(directory):
+    """
+    Returns the ranks saved for the cached link graph, or None.
+    """
+    path = os.path.join(crawler.path_for(directory), "ranks.npy")
+    if not os.path.exists(path):
+        return None
+    return np.load(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+import crawler
+import pagerank
+
+# Links read from disk at a time
+BLOCK = 1 << 22
+
+
+def main():
+    if len(sys.argv) not in (2, 3):
+        sys.exit("Usage: python outofcore.py corpus [block]")
+    directory = sys.argv[1]
+    block = int(sys.argv[2]) if len(sys.argv) == 3 else BLOCK
+
+    # Recrawl unless the cache matches the pages, or there are no pages
+    if not crawler.is_synthetic(directory) and \
+            not crawler.is_cached(directory, crawler.listing(directory)[1]):
+        print("Crawling...")
+        crawler.crawl_graph(directory)
+    indptr, indices = open_edges(directory)
+    pages, links = len(indptr) - 1, len(indices)
+    print(f"{pages} pages, {links} links; "
+          f"about {memory_ceiling(pages, links, block) / 2 ** 20:.1f} MiB in memory, "
+          f"{io_per_iteration(pages, links) / 2 ** 20:.1f} MiB read per iteration")
+
+    start = time.perf_counter()
+    ranks, iterations = power_iteration(indptr, indices, pagerank.DAMPING, block=block)
+    print(f"{iterations} iterations in {time.perf_counter() - start:.2f}s")
+
+    top = np.argpartition(-ranks, min(10, len(ranks)) - 1)[:10]
+    top = top[np.argsort(-ranks[top], kind="stable")].tolist()
+    names = page_names(directory, top)
+    print("Top pages:")
+    for i in top:
+        print(f"  {names[i]}: {ranks[i]:.6f}")
+
+
+def open_edges(directory):
+    """
+    Memory-map the link graph cached by crawler.py for `directory`:
+    int64 offsets by source page and the source-sorted int32 targets.
+    """
+    path = crawler.path_for(directory)
+    return (np.load(os.path.join(path, "indptr.npy"), mmap_mode="r"),
+            np.load(os.path.join(path, "indices.npy"), mmap_mode="r"))
+
+
+def memory_ceiling(pages, links, block=BLOCK):
+    """
+    Bytes held in memory by `power_iteration`: three float64 vectors of
+    `pages` entries (old ranks, new ranks and the per-block sum), plus
+    about 24 bytes per link of the block being processed.
+    """
+    return 24 * pages + 24 * min(block, links)
+
+
+def io_per_iteration(pages, links):
+    """
+    Bytes read from disk by one sweep of `power_iteration`: the int64
+    offset of every page and the int32 target of every link, read
+    sequentially once each.
+    """
+    return 8 * (pages + 1) + 4 * links
+
+
+def power_iteration(indptr, indices, damping_factor,
+                    tolerance=pagerank.TOLERANCE, block=BLOCK):
+    """
+    Run PageRank power iteration over a link graph on disk, given as
+    memory-mapped CSR arrays such as those of `open_edges`, with the
+    same result as `pagerank.power_iteration`.
+
+    Each sweep streams the links `block` at a time in source order,
+    adding each source's rank share into the new ranks of its targets.
+    Only the rank vectors and one block are held in memory (see
+    `memory_ceiling` and `io_per_iteration`).
+    Returns an array of ranks by page index and the number of sweeps.
+    """
+    n = len(indptr) - 1
+    boundaries = blocks(indptr, block)
+    ranks = np.full(n, 1 / n)
+    iterations = 0
+    while True:
+        iterations += 1
+        new_ranks = np.zeros(n)
+        dangling = 0.0
+        for start, end in boundaries:
+            offsets = np.asarray(indptr[start:end + 1])
+            degree = np.diff(offsets)
+            rank = ranks[start:end]
+            dangling += rank[degree == 0].sum()
+            shares = np.repeat(rank / np.maximum(degree, 1), degree)
+            targets = np.asarray(indices[offsets[0]:offsets[-1]])
+            new_ranks += np.bincount(targets, weights=shares, minlength=n)
+
+        new_ranks *= damping_factor
+        new_ranks += (1 - damping_factor + damping_factor * dangling) / n
+        change = np.abs(new_ranks - ranks).sum()
+        ranks = new_ranks
+        if change < tolerance:
+            return ranks, iterations
+
+
+def blocks(indptr, block):
+    """
+    Returns (start, end) ranges of CSR rows with about `block` entries
+    each, found by binary search on the offsets without reading them all.
+    """
+    n = len(indptr) - 1
+    boundaries = []
+    start = 0
+    while start < n:
+        end = int(np.searchsorted(indptr, indptr[start] + block, side="right")) - 1
+        end = min(max(end, start + 1), n)
+        boundaries.append((start, end))
+        start = end
+    return boundaries
+
+
+def page_names(directory, wanted):
+    """
+    Returns a dict of the names of the page indices in `wanted`, reading
+    the cached page list one line at a time.
+    """
+    wanted = set(wanted)
+    names = {}
+    with open(os.path.join(crawler.path_for(directory), "pages.txt"),
+              encoding="utf-8") as f:
+        for i, line in enumerate(f):
+            if i in wanted:
+                names[i] = line.rstrip("\n")
+    return names
+
+
+def write_random(directory, n, degree=8, seed=0, block=BLOCK):
+    """
+    Write a synthetic graph like `LinkGraph.random` (but not the same
+    links) to `crawler.path_for(directory)` without holding it in
+    memory, generating about `block` links at a time.
+
+    Each block of sources is generated twice from the same seed: once
+    to count its links after dropping repeats, then again to write them.
+    """
+    path = crawler.path_for(directory)
+    os.makedirs(path, exist_ok=True)
+    if os.path.exists(os.path.join(path, "ranks.npy")):
+        os.remove(os.path.join(path, "ranks.npy"))
+    per_block = max(1, block // max(degree, 1))
+    ranges = [(start, min(start + per_block, n)) for start in range(0, n, per_block)]
+
+    def generate(number, start, end):
+        rng = np.random.default_rng([seed, number])
+        counts = rng.poisson(degree, end - start)
+        sources = np.repeat(np.arange(start, end), counts)
+        targets = rng.integers(0, n, len(sources))
+        keep = sources != targets
+        keys = np.sort(sources[keep] * n + targets[keep])
+        keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+        return np.divmod(keys, n)
+
+    indptr = np.lib.format.open_memmap(
+        os.path.join(path, "indptr.npy"), mode="w+", dtype=np.int64, shape=(n + 1,)
+    )
+    indptr[0] = 0
+    for number, (start, end) in enumerate(ranges):
+        sources, _ = generate(number, start, end)
+        counts = np.bincount(sources - start, minlength=end - start)
+        indptr[start + 1:end + 1] = indptr[start] + np.cumsum(counts)
+
+    indices = np.lib.format.open_memmap(
+        os.path.join(path, "indices.npy"), mode="w+", dtype=np.int32,
+        shape=(int(indptr[n]),)
+    )
+    for number, (start, end) in enumerate(ranges):
+        _, targets = generate(number, start, end)
+        indices[indptr[start]:indptr[end]] = targets
+    indptr.flush()
+    indices.flush()
+    del indptr, indices
+
+    with open(os.path.join(path, "pages.txt"), "w", encoding="utf-8") as f:
+        for start in range(0, n, per_block):
+            f.write("".join(f"{i}.html\n" for i in range(start, min(start + per_block, n))))
+    crawler.write_manifest(directory, None)
+
+
+if __name__ == "__main__":
+    main()
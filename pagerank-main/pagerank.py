@@ -3,19 +3,32 @@ import random
 import re
 import sys
 
+import numpy as np
+
+from graph import LinkGraph
+
 DAMPING = 0.85
 SAMPLES = 10000
 
+# Number of random surfers stepped together by the vectorized sampler
+WALKERS = 10000
+
+# Steps each surfer takes before its pages are counted as samples
+BURN_IN = 50
+
+# Power iteration stops once the ranks change by less than this (L1 norm)
+TOLERANCE = 1e-8
+
 
 def main():
     if len(sys.argv) != 2:
         sys.exit("Usage: python pagerank.py corpus")
     corpus = crawl(sys.argv[1])
-    ranks = sample_pagerank(corpus, DAMPING, SAMPLES)
+    ranks = sample_pagerank_vectorized(corpus, DAMPING, SAMPLES)
     print(f"PageRank Results from Sampling (n = {SAMPLES})")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
-    ranks = iterate_pagerank(corpus, DAMPING)
+    ranks = iterate_pagerank_sparse(corpus, DAMPING)
     print(f"PageRank Results from Iteration")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
@@ -150,6 +163,103 @@ def iterate_pagerank(corpus, damping_factor):
                 
             
 
+def iterate_pagerank_sparse(corpus, damping_factor, tolerance=TOLERANCE):
+    """
+    Return the same PageRank values as `iterate_pagerank`, computed by
+    power iteration over a sparse transition matrix in O(links) per
+    sweep instead of O(N^2).
+    """
+    graph = LinkGraph.from_corpus(corpus)
+    ranks, _ = power_iteration(graph, damping_factor, tolerance)
+    return graph.to_dict(ranks)
+
+
+def power_iteration(graph, damping_factor, tolerance=TOLERANCE, start=None):
+    """
+    Run PageRank power iteration on a `LinkGraph` until the L1 change
+    between sweeps falls below `tolerance`, starting from the uniform
+    distribution or from the ranks `start` if given.
+
+    The rank of dangling pages is spread evenly over all pages, as the
+    random surfer picks any page when there are no links to follow.
+    Returns an array of ranks by page index and the number of sweeps.
+    """
+    n = len(graph)
+    matrix = graph.transition()
+    dangling = graph.dangling
+    if start is None:
+        ranks = np.full(n, 1 / n)
+    else:
+        ranks = np.asarray(start, dtype=np.float64) / np.sum(start)
+    iterations = 0
+    while True:
+        iterations += 1
+        teleport = (1 - damping_factor + damping_factor * ranks[dangling].sum()) / n
+        new_ranks = damping_factor * (matrix @ ranks) + teleport
+        change = np.abs(new_ranks - ranks).sum()
+        ranks = new_ranks
+        if change < tolerance:
+            return ranks, iterations
+
+
+def sample_pagerank_vectorized(corpus, damping_factor, n, walkers=WALKERS, seed=None):
+    """
+    Return PageRank values estimated from `n` samples, like
+    `sample_pagerank`, but with `walkers` independent surfers moved
+    together as NumPy arrays instead of one transition model per step.
+    """
+    graph = LinkGraph.from_corpus(corpus)
+    counts = random_walks(graph, damping_factor, n, walkers, seed)
+    return graph.to_dict(counts / n)
+
+
+def random_walks(graph, damping_factor, n, walkers=WALKERS, seed=None):
+    """
+    Take `n` samples in total from `walkers` random surfers on a
+    `LinkGraph`. Returns the number of samples that landed on each page.
+
+    Surfers start at random pages and take BURN_IN unrecorded steps
+    first, so even a surfer that is sampled only once is close to the
+    stationary distribution.
+    """
+    rng = np.random.default_rng(seed)
+    size = len(graph)
+    out_degree = graph.out_degree
+    counts = np.zeros(size, dtype=np.int64)
+    visited = []
+    buffered = 0
+
+    pages = rng.integers(0, size, min(walkers, n))
+    for _ in range(BURN_IN):
+        pages = step(graph, out_degree, pages, damping_factor, rng)
+    remaining = n
+    while remaining > 0:
+        pages = pages[:remaining]
+        visited.append(pages)
+        buffered += len(pages)
+        remaining -= len(pages)
+        # Count visits in batches so each bincount is worth its O(N) cost
+        if buffered >= size or remaining == 0:
+            counts += np.bincount(np.concatenate(visited), minlength=size)
+            visited, buffered = [], 0
+        pages = step(graph, out_degree, pages, damping_factor, rng)
+    return counts
+
+
+def step(graph, out_degree, pages, damping_factor, rng):
+    """
+    Move every surfer in `pages` one step along the transition model.
+
+    Every link of a page is equally likely, so following a link only
+    needs the page's CSR row: the surfer takes link `floor(u * degree)`.
+    """
+    degree = out_degree[pages]
+    follow = (rng.random(len(pages)) < damping_factor) & (degree > 0)
+    choice = (rng.random(int(follow.sum())) * degree[follow]).astype(np.int64)
+    following = graph.indices[graph.indptr[pages[follow]] + choice]
+    pages = rng.integers(0, len(graph), len(pages))
+    pages[follow] = following
+    return pages
 
 
 if __name__ == "__main__":
@@ -0,0 +1,141 @@
+import os
+import sys
+import time
+from multiprocessing import Pool, shared_memory
+
+import numpy as np
+import scipy.sparse
+
+import pagerank
+from graph import LinkGraph
+from outofcore import blocks
+
+# Incoming links per block of destination pages; blocks do not depend on
+# the number of workers, so neither do the results
+BLOCK = 1 << 20
+
+
+def main():
+    if len(sys.argv) not in (2, 3):
+        sys.exit("Usage: python parallel.py corpus [processes]")
+    corpus = pagerank.crawl(sys.argv[1])
+    processes = int(sys.argv[2]) if len(sys.argv) == 3 else None
+
+    start = time.perf_counter()
+    ranks = iterate_pagerank(corpus, pagerank.DAMPING, processes)
+    print(f"PageRank Results from Parallel Iteration "
+          f"({processes or os.cpu_count()} processes, "
+          f"{time.perf_counter() - start:.2f}s)")
+    for page in sorted(ranks):
+        print(f"  {page}: {ranks[page]:.4f}")
+
+
+def iterate_pagerank(corpus, damping_factor, processes=None,
+                     tolerance=pagerank.TOLERANCE):
+    """
+    Return the same PageRank values as `pagerank.iterate_pagerank_sparse`,
+    computed on a pool of `processes` workers.
+    """
+    graph = LinkGraph.from_corpus(corpus)
+    ranks, _ = power_iteration(graph, damping_factor, tolerance, processes)
+    return graph.to_dict(ranks)
+
+
+def power_iteration(graph, damping_factor, tolerance=pagerank.TOLERANCE,
+                    processes=None, block=BLOCK):
+    """
+    Run PageRank power iteration on a `LinkGraph` with the destination
+    pages split into blocks of about `block` incoming links, computed
+    on a pool of `processes` workers.
+
+    The transition matrix and both rank vectors live in shared memory,
+    so each sweep only sends block numbers to the workers. Each worker
+    writes the new ranks of its blocks row by row, and the sums over
+    all pages are taken in the parent, so the ranks are bit-for-bit
+    the same for any number of workers.
+    Returns an array of ranks by page index and the number of sweeps.
+    """
+    n = len(graph)
+    matrix = graph.transition()
+    dangling = graph.dangling
+    boundaries = blocks(matrix.indptr, block)
+
+    arrays = {
+        "data": matrix.data, "indices": matrix.indices,
+        "indptr": matrix.indptr, "ranks": np.full(n, 1 / n), "new_ranks": np.zeros(n)
+    }
+    segments = {}
+    try:
+        for name, array in arrays.items():
+            segment = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, array.dtype, buffer=segment.buf)[:] = array
+            segments[name] = segment
+        layout = {
+            name: (segments[name].name, array.shape, array.dtype.str)
+            for name, array in arrays.items()
+        }
+        ranks = _attach(layout, "ranks", segments)
+        new_ranks = _attach(layout, "new_ranks", segments)
+
+        with Pool(processes, initializer=_init_worker, initargs=(layout, n)) as pool:
+            iterations = 0
+            while True:
+                iterations += 1
+                teleport = (1 - damping_factor + damping_factor * ranks[dangling].sum()) / n
+                pool.map(_sweep_block, [
+                    (start, end, damping_factor, teleport) for start, end in boundaries
+                ])
+                change = np.abs(new_ranks - ranks).sum()
+                ranks[:] = new_ranks
+                if change < tolerance:
+                    result = ranks.copy()
+                    break
+        del ranks, new_ranks
+    finally:
+        for segment in segments.values():
+            segment.close()
+            segment.unlink()
+    return result, iterations
+
+
+def _attach(layout, name, segments):
+    """
+    Returns an array over the shared memory segment `name` of `layout`,
+    opening it unless it is already in `segments`. Segments must stay
+    referenced from `segments` for as long as the array is used.
+    """
+    segment_name, shape, dtype = layout[name]
+    if name not in segments:
+        segments[name] = shared_memory.SharedMemory(name=segment_name)
+    return np.ndarray(shape, dtype, buffer=segments[name].buf)
+
+
+def _init_worker(layout, n):
+    """
+    Map the shared transition matrix and rank vectors into a worker.
+    """
+    global worker_arrays, worker_n, worker_segments
+    worker_segments = {}
+    worker_arrays = {name: _attach(layout, name, worker_segments) for name in layout}
+    worker_n = n
+
+
+def _sweep_block(task):
+    """
+    Write the new ranks of destination pages `start` to `end`.
+    """
+    start, end, damping_factor, teleport = task
+    data, indices, indptr = (worker_arrays[name] for name in ("data", "indices", "indptr"))
+    first, last = indptr[start], indptr[end]
+    rows = scipy.sparse.csr_matrix(
+        (data[first:last], indices[first:last], indptr[start:end + 1] - first),
+        shape=(end - start, worker_n)
+    )
+    new_ranks = worker_arrays["new_ranks"]
+    new_ranks[start:end] = rows @ worker_arrays["ranks"]
+    new_ranks[start:end] *= damping_factor
+    new_ranks[start:end] += teleport
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import sys
+from collections import deque
+
+import numpy as np
+
+import pagerank
+from graph import LinkGraph
+
+# Forward push stops once no page holds more residual than this per link
+EPSILON = 1e-6
+
+
+def main():
+    if len(sys.argv) < 3:
+        sys.exit("Usage: python personalized.py corpus page [page ...]")
+    corpus = pagerank.crawl(sys.argv[1])
+    seeds = sys.argv[2:]
+    for seed in seeds:
+        if seed not in corpus:
+            sys.exit(f"{seed} is not in the corpus.")
+
+    # One column per seed page, plus one for all seeds together
+    seed_sets = [{seed} for seed in seeds] + [set(seeds)]
+    results = personalized_ranks(corpus, seed_sets, pagerank.DAMPING)
+    for seed_set, ranks in zip(seed_sets, results):
+        print(f"PageRank Results personalized to {', '.join(sorted(seed_set))}")
+        for page in sorted(ranks):
+            print(f"  {page}: {ranks[page]:.4f}")
+
+    for seed in seeds:
+        ranks = forward_push(corpus, seed, pagerank.DAMPING)
+        print(f"PageRank Results from Forward Push from {seed}")
+        for page in sorted(ranks):
+            print(f"  {page}: {ranks[page]:.4f}")
+
+
+def personalized_ranks(corpus, seed_sets, damping_factor,
+                       tolerance=pagerank.TOLERANCE):
+    """
+    Return one PageRank dict per set of pages in `seed_sets`, where the
+    random surfer teleports only to pages of that set.
+    """
+    graph = LinkGraph.from_corpus(corpus)
+    index = {page: i for i, page in enumerate(graph.pages)}
+    teleport = np.zeros((len(graph), len(seed_sets)))
+    for column, seeds in enumerate(seed_sets):
+        for page in seeds:
+            teleport[index[page], column] = 1 / len(seeds)
+    ranks, _ = personalized_pagerank(graph, teleport, damping_factor, tolerance)
+    return [graph.to_dict(ranks[:, column]) for column in range(len(seed_sets))]
+
+
+def personalized_pagerank(graph, teleport, damping_factor,
+                          tolerance=pagerank.TOLERANCE):
+    """
+    Run power iteration for every column of the N x k matrix `teleport`
+    at once, each column giving the teleport distribution of one
+    personalization. Each sweep is one sparse-dense product.
+
+    Dangling pages send their rank to the teleport distribution, so a
+    uniform column gives the same ranks as `pagerank.power_iteration`.
+    Iteration stops once no column changes by `tolerance` (L1 norm).
+    Returns the N x k matrix of ranks and the number of sweeps.
+    """
+    teleport = np.asarray(teleport, dtype=np.float64)
+    teleport = teleport / teleport.sum(axis=0)
+    matrix = graph.transition()
+    dangling = graph.dangling
+    ranks = teleport.copy()
+
+    # Seed sets are small, so add teleportation only where it is nonzero
+    rows, columns = np.nonzero(teleport)
+    weights = teleport[rows, columns]
+    iterations = 0
+    while True:
+        iterations += 1
+        mass = 1 - damping_factor + damping_factor * ranks[dangling].sum(axis=0)
+        new_ranks = matrix @ ranks
+        new_ranks *= damping_factor
+        new_ranks[rows, columns] += weights * mass[columns]
+        ranks -= new_ranks
+        change = np.abs(ranks, out=ranks).sum(axis=0).max()
+        ranks = new_ranks
+        if change < tolerance:
+            return ranks, iterations
+
+
+def forward_push(corpus, seed, damping_factor, epsilon=EPSILON):
+    """
+    Approximate the PageRank personalized to a single `seed` page by
+    forward push on the crawl dict, touching only pages near the seed.
+
+    Each page holds an estimate and a residual. Pushing a page moves
+    1 - damping_factor of its residual into its estimate and spreads the
+    rest over its links (back to the seed for pages without links),
+    until no page has more than `epsilon` residual per link. Estimates
+    fall short of the exact ranks by at most the residual left over.
+    Returns a dict of the pages with a nonzero estimate.
+    """
+    estimate = {}
+    residual = {seed: 1.0}
+    queue = deque([seed])
+    queued = {seed}
+    while queue:
+        page = queue.popleft()
+        queued.discard(page)
+        mass = residual.pop(page)
+        estimate[page] = estimate.get(page, 0) + (1 - damping_factor) * mass
+
+        links = corpus[page] or (seed,)
+        share = damping_factor * mass / len(links)
+        for link in links:
+            residual[link] = residual.get(link, 0) + share
+            if link not in queued and residual[link] > epsilon * max(len(corpus[link]), 1):
+                queue.append(link)
+                queued.add(link)
+    return estimate
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+import bisect
+import heapq
+import json
+import mmap
+import os
+import sys
+
+import numpy as np
+
+import crawler
+import pagerank
+
+# Bump when the on-disk layout changes
+VERSION = 1
+
+# Ranks scanned at a time by `RankFile.top`
+CHUNK = 1 << 20
+
+
+def main():
+    usage = ("Usage: python ranks.py export corpus output\n"
+             "       python ranks.py top ranks [k]\n"
+             "       python ranks.py rank ranks page\n"
+             "       python ranks.py percentile ranks p")
+    if len(sys.argv) < 3:
+        sys.exit(usage)
+    command = sys.argv[1]
+    if command == "export" and len(sys.argv) == 4:
+        graph, _ = crawler.crawl_graph(sys.argv[2])
+        ranks, _ = pagerank.power_iteration(graph, pagerank.DAMPING)
+        export(sys.argv[3], graph.pages, ranks)
+        print(f"Ranks of {len(graph)} pages written to {sys.argv[3]}.")
+        return
+
+    ranks = RankFile.open(sys.argv[2])
+    if command == "top" and len(sys.argv) in (3, 4):
+        k = int(sys.argv[3]) if len(sys.argv) == 4 else 10
+        for page, rank in ranks.top(k):
+            print(f"  {page}: {rank:.6g}")
+    elif command == "rank" and len(sys.argv) == 4:
+        rank = ranks.rank(sys.argv[3])
+        if rank is None:
+            sys.exit(f"{sys.argv[3]} is not ranked.")
+        print(f"{sys.argv[3]}: {rank:.6g}, ranked higher than "
+              f"{ranks.percentile(sys.argv[3]):.2f}% of pages")
+    elif command == "percentile" and len(sys.argv) == 4:
+        page, rank = ranks.at_percentile(float(sys.argv[3]))
+        print(f"{page}: {rank:.6g}")
+    else:
+        sys.exit(usage)
+
+
+def export(path, pages, ranks):
+    """
+    Write the ranks of `pages` to directory `path` in columns:
+
+    ranks.npy       float64 rank of each page, by page index
+    pages.bin/.npy  page names, each stored once, as a UTF-8 blob and
+                    the int64 offset of every name in it
+    by_name.npy     int32 page indices in name order, for lookups
+    by_rank.npy     int32 page indices from highest rank to lowest
+    sorted.npy      the ranks in that order, for percentile queries
+    """
+    os.makedirs(path, exist_ok=True)
+    ranks = np.asarray(ranks, dtype=np.float64)
+    np.save(os.path.join(path, "ranks.npy"), ranks)
+
+    encoded = [page.encode("utf-8") for page in pages]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(name) for name in encoded], out=offsets[1:])
+    with open(os.path.join(path, "pages.bin"), "wb") as f:
+        f.write(b"".join(encoded))
+    np.save(os.path.join(path, "pages.npy"), offsets)
+
+    by_name = sorted(range(len(pages)), key=encoded.__getitem__)
+    np.save(os.path.join(path, "by_name.npy"), np.array(by_name, dtype=np.int32))
+    by_rank = np.argsort(-ranks, kind="stable").astype(np.int32)
+    np.save(os.path.join(path, "by_rank.npy"), by_rank)
+    np.save(os.path.join(path, "sorted.npy"), ranks[by_rank])
+    with open(os.path.join(path, "manifest.json"), "w") as f:
+        json.dump({"version": VERSION, "pages": len(pages)}, f)
+
+
+class RankFile():
+    """
+    Ranks exported by `export`, memory-mapped so that queries only read
+    the parts of the file they need.
+    """
+
+    def __init__(self, ranks, names, offsets, by_name, by_rank, ordered):
+        self.ranks = ranks
+        self.names = names
+        self.offsets = offsets
+        self.by_name = by_name
+        self.by_rank = by_rank
+        self.ordered = ordered
+
+    @classmethod
+    def open(cls, path):
+        with open(os.path.join(path, "manifest.json")) as f:
+            if json.load(f).get("version") != VERSION:
+                raise ValueError(f"{path} was written by another version")
+        with open(os.path.join(path, "pages.bin"), "rb") as f:
+            names = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) \
+                if os.fstat(f.fileno()).st_size else b""
+        arrays = [
+            np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+            for name in ("ranks", "pages", "by_name", "by_rank", "sorted")
+        ]
+        return cls(arrays[0], names, arrays[1], *arrays[2:])
+
+    def __len__(self):
+        return len(self.ranks)
+
+    def name(self, i):
+        """
+        Returns the name of page index `i`.
+        """
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return self.names[start:end].decode("utf-8")
+
+    def index(self, page):
+        """
+        Returns the index of a page by binary search over the names in
+        name order, or None if it is not ranked.
+        """
+        key = page.encode("utf-8")
+        position = bisect.bisect_left(_NameView(self), key)
+        if position < len(self) and self.name(self.by_name[position]) == page:
+            return int(self.by_name[position])
+        return None
+
+    def rank(self, page):
+        """
+        Returns the rank of a page, or None if it is not ranked.
+        """
+        i = self.index(page)
+        return None if i is None else float(self.ranks[i])
+
+    def top(self, k=10):
+        """
+        Returns the `k` (page, rank) pairs with the highest ranks, best
+        first, scanning the ranks CHUNK at a time with a heap of size k.
+        """
+        heap = []
+        for start in range(0, len(self), CHUNK):
+            chunk = np.asarray(self.ranks[start:start + CHUNK])
+            # Only the k best of a chunk can enter the heap
+            candidates = np.argpartition(-chunk, k - 1)[:k] if len(chunk) > k \
+                else np.arange(len(chunk))
+            for i in candidates.tolist():
+                # Ties go to the lower page index
+                entry = (float(chunk[i]), -(start + i))
+                if len(heap) < k:
+                    heapq.heappush(heap, entry)
+                elif entry > heap[0]:
+                    heapq.heapreplace(heap, entry)
+        return [(self.name(-i), rank) for rank, i in sorted(heap, reverse=True)]
+
+    def percentile(self, page):
+        """
+        Returns the percentage of pages ranked strictly lower than `page`,
+        by binary search over the sorted ranks.
+        """
+        rank = self.rank(page)
+        if rank is None:
+            return None
+        # `ordered` is descending, so pages from here on rank lower
+        higher = bisect.bisect_right(self.ordered, -rank, key=lambda value: -value)
+        lower = len(self) - higher
+        return 100 * lower / len(self)
+
+    def at_percentile(self, p):
+        """
+        Returns the (page, rank) ranked higher than `p` percent of pages.
+        """
+        position = min(len(self) - 1, max(0, len(self) - 1 - int(p / 100 * len(self))))
+        i = int(self.by_rank[position])
+        return self.name(i), float(self.ordered[position])
+
+
+class _NameView():
+    """
+    Sequence of encoded page names in name order, for `bisect`.
+    """
+
+    def __init__(self, ranks):
+        self.ranks = ranks
+
+    def __len__(self):
+        return len(self.ranks)
+
+    def __getitem__(self, position):
+        i = self.ranks.by_name[position]
+        return self.ranks.names[self.ranks.offsets[i]:self.ranks.offsets[i + 1]]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+import sys
+import time
+
+import numpy as np
+import scipy.sparse
+import scipy.sparse.linalg
+
+import pagerank
+from graph import LinkGraph
+
+METHODS = ("jacobi", "gauss-seidel", "aitken", "quadratic")
+
+NORMS = {
+    "l1": lambda x: np.abs(x).sum(),
+    "l2": lambda x: np.sqrt(np.dot(x, x)),
+    "inf": lambda x: np.abs(x).max()
+}
+
+# Least sweeps between extrapolation steps for the "aitken" and "quadratic"
+# methods, and how closely the ratios of the last residuals must agree first
+EXTRAPOLATE_EVERY = 10
+STABLE_RATIO = 0.05
+
+# Give up after this many sweeps, for damping factors that do not converge
+MAX_ITERATIONS = 10000
+
+
+def main():
+    if len(sys.argv) < 2 or len(sys.argv) > 4:
+        sys.exit("Usage: python solvers.py corpus [method|all] [l1|l2|inf]")
+    corpus = pagerank.crawl(sys.argv[1])
+    method = sys.argv[2] if len(sys.argv) > 2 else "all"
+    norm = sys.argv[3] if len(sys.argv) > 3 else "l1"
+    methods = METHODS if method == "all" else [method]
+
+    graph = LinkGraph.from_corpus(corpus)
+    for method in methods:
+        ranks, diagnostics = solve(graph, pagerank.DAMPING, method, norm=norm)
+        print(f"{method}: {diagnostics['iterations']} iterations "
+              f"in {1000 * diagnostics['seconds']:.2f}ms")
+        for iteration, residual in enumerate(diagnostics["residuals"], 1):
+            print(f"  {iteration:4d}  {norm} residual {residual:.3e}")
+        for page, rank in sorted(graph.to_dict(ranks).items()):
+            print(f"  {page}: {rank:.4f}")
+
+
+def iterate_pagerank(corpus, damping_factor, method="jacobi",
+                     tolerance=pagerank.TOLERANCE, norm="l1"):
+    """
+    Return PageRank values for each page like `pagerank.iterate_pagerank`,
+    using the solver `method`, together with its diagnostics.
+    """
+    graph = LinkGraph.from_corpus(corpus)
+    ranks, diagnostics = solve(graph, damping_factor, method, tolerance, norm)
+    return graph.to_dict(ranks), diagnostics
+
+
+def solve(graph, damping_factor, method="jacobi", tolerance=pagerank.TOLERANCE,
+          norm="l1", log=None):
+    """
+    Compute PageRank for a `LinkGraph` with one of METHODS:
+
+    "jacobi"        power iteration, as `pagerank.power_iteration`
+    "gauss-seidel"  sweeps that use the ranks already updated in the same
+                    sweep, like `pagerank.iterate_pagerank`
+    "aitken"        power iteration with Aitken delta-squared
+                    extrapolation
+    "quadratic"     power iteration with quadratic extrapolation
+
+    Extrapolation assumes the error shrinks by a steady ratio each sweep,
+    so it is only applied once the ratios of the last residuals agree to
+    within STABLE_RATIO, and at most every EXTRAPOLATE_EVERY sweeps.
+
+    Iteration stops once the `norm` ("l1", "l2" or "inf") of the change
+    in ranks over a sweep falls below `tolerance`. `log`, if given, is
+    called with the iteration number and residual after every sweep.
+
+    Returns the ranks by page index and a dict of diagnostics: the
+    method, norm, iterations, seconds and the residual of each sweep.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown method {method!r}, expected one of {METHODS}")
+    if norm not in NORMS:
+        raise ValueError(f"Unknown norm {norm!r}, expected one of {tuple(NORMS)}")
+    measure = NORMS[norm]
+    sweep = _gauss_seidel(graph, damping_factor) if method == "gauss-seidel" \
+        else _jacobi(graph, damping_factor)
+
+    start = time.perf_counter()
+    n = len(graph)
+    ranks = np.full(n, 1 / n)
+    history = [ranks]
+    residuals = []
+    extrapolated = 0
+    while len(residuals) < MAX_ITERATIONS:
+        new_ranks = sweep(ranks)
+        history = history[-3:] + [new_ranks]
+        iteration = len(residuals) + 1
+        if (method in ("aitken", "quadratic") and len(history) == 4
+                and iteration - extrapolated >= EXTRAPOLATE_EVERY
+                and _is_stable(history, measure)):
+            new_ranks = _extrapolate(method, history)
+            extrapolated = iteration
+            # Later extrapolations need plain sweeps from the new point
+            history = [new_ranks]
+        residual = measure(new_ranks - ranks)
+        residuals.append(residual)
+        if log is not None:
+            log(iteration, residual)
+        ranks = new_ranks
+        if residual < tolerance:
+            break
+
+    return ranks, {
+        "method": method,
+        "norm": norm,
+        "iterations": len(residuals),
+        "seconds": time.perf_counter() - start,
+        "residuals": residuals
+    }
+
+
+def _jacobi(graph, damping_factor):
+    """
+    Returns a function taking ranks to the ranks after one power
+    iteration sweep.
+    """
+    n = len(graph)
+    matrix = graph.transition()
+    dangling = graph.dangling
+
+    def sweep(ranks):
+        teleport = (1 - damping_factor + damping_factor * ranks[dangling].sum()) / n
+        return damping_factor * (matrix @ ranks) + teleport
+
+    return sweep
+
+
+def _gauss_seidel(graph, damping_factor):
+    """
+    Returns a function taking ranks to the ranks after one Gauss-Seidel
+    sweep, in page order.
+
+    PageRank satisfies (I - d M) x = (1 - d + d s) / N, where s is the
+    rank of the dangling pages. Splitting I - d M into its lower
+    triangle L and strict upper triangle -U, a sweep solves
+    L x' = (1 - d + d s) / N + U x, a single sparse triangular solve.
+    """
+    n = len(graph)
+    system = (scipy.sparse.identity(n, format="csr")
+              - damping_factor * graph.transition()).tocsr()
+    # No page links to itself, so the diagonal is all ones
+    lower = scipy.sparse.tril(system, format="csr")
+    upper = -scipy.sparse.triu(system, k=1, format="csr")
+    dangling = graph.dangling
+
+    def sweep(ranks):
+        teleport = (1 - damping_factor + damping_factor * ranks[dangling].sum()) / n
+        ranks = scipy.sparse.linalg.spsolve_triangular(
+            lower, upper @ ranks + teleport, lower=True, unit_diagonal=True
+        )
+        return ranks / ranks.sum()
+
+    return sweep
+
+
+def _is_stable(history, measure):
+    """
+    Returns True if the four successive iterates in `history` converge
+    by a steady ratio below 1, measured by the norm `measure`.
+    """
+    x0, x1, x2, x3 = history
+    first, second, third = measure(x1 - x0), measure(x2 - x1), measure(x3 - x2)
+    if first == 0 or second == 0:
+        return False
+    ratio = third / second
+    return ratio < 1 and abs(second / first - ratio) <= STABLE_RATIO * ratio
+
+
+def _extrapolate(method, history):
+    """
+    Returns an extrapolated estimate of the ranks from four successive
+    iterates in `history`, oldest first, renormalized to sum to 1.
+    """
+    x0, x1, x2, x3 = history
+    if method == "aitken":
+        # Aitken delta-squared, per page, on the last three iterates, for
+        # the pages whose own changes shrink by a steady ratio
+        first, second, third = x1 - x0, x2 - x1, x3 - x2
+        safe = (np.abs(first) > 1e-300) & (np.abs(second) > 1e-300)
+        ratio = np.divide(third, second, out=np.zeros_like(third), where=safe)
+        earlier = np.divide(second, first, out=np.zeros_like(third), where=safe)
+        safe &= (np.abs(ratio) < 1) & (np.abs(earlier - ratio) <= STABLE_RATIO * np.abs(ratio))
+        ranks = x3.copy()
+        ranks[safe] = x3[safe] + third[safe] * ratio[safe] / (1 - ratio[safe])
+    else:
+        # Quadratic extrapolation (Kamvar et al.), assuming the iterates
+        # are a combination of the three leading eigenvectors
+        y = np.column_stack([x1 - x0, x2 - x0])
+        gamma = np.linalg.lstsq(y, -(x3 - x0), rcond=None)[0]
+        gamma1, gamma2, gamma3 = gamma[0], gamma[1], 1.0
+        ranks = ((gamma1 + gamma2 + gamma3) * x1
+                 + (gamma2 + gamma3) * x2 + gamma3 * x3)
+
+    ranks = np.maximum(ranks, 0)
+    total = ranks.sum()
+    return ranks / total if total > 0 else x3
+
+
+if __name__ == "__main__":
+    main()